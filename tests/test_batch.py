@@ -0,0 +1,29 @@
+from witch_gif.batch import plan_workers
+
+
+def test_one_file_per_core_by_default():
+    assert plan_workers(16, cores=8) == (8, 1)
+
+
+def test_spare_cores_go_to_ffmpeg_threads():
+    assert plan_workers(2, cores=8) == (2, 4)
+    assert plan_workers(1, cores=8) == (1, 8)
+
+
+def test_explicit_jobs_are_capped_by_file_count():
+    assert plan_workers(3, jobs=6, cores=12) == (3, 4)
+    assert plan_workers(10, jobs=4, cores=12) == (4, 3)
+
+
+def test_never_oversubscribes_or_drops_to_zero():
+    for files in (0, 1, 3, 7, 50):
+        for cores in (1, 2, 6, 16):
+            jobs, threads = plan_workers(files, cores=cores)
+            assert jobs >= 1 and threads >= 1
+            assert jobs * threads <= max(cores, 1)
+
+
+def test_in_process_work_keeps_a_core_back():
+    assert plan_workers(16, cores=8, in_process=True) == (7, 1)
+    assert plan_workers(1, cores=8, in_process=True) == (1, 7)
+    assert plan_workers(4, cores=1, in_process=True) == (1, 1)
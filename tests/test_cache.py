@@ -0,0 +1,69 @@
+import os
+from dataclasses import replace
+
+from witch_gif.cache import ResultCache, settings_key
+from witch_gif.engine import QUALITY_PRESETS, OptimizeConfig
+
+DIGEST = "ab" * 32
+
+
+def params(size):
+    return {"scale": 480, "lossy": 40, "size": size}
+
+
+def test_lookup_needs_the_exact_target(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.store(DIGEST, "s1", 5.0, params(4_900_000))
+    assert cache.lookup(DIGEST, "s1", 5.0)["params"]["size"] == 4_900_000
+    assert cache.lookup(DIGEST, "s1", 4.0) is None
+    assert cache.lookup(DIGEST, "s2", 5.0) is None
+
+
+def test_lookup_returns_the_kept_output(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    out = tmp_path / "out.gif"
+    out.write_bytes(b"GIF89a")
+    cache.store(DIGEST, "s1", 5.0, params(6), str(out))
+    with open(cache.lookup(DIGEST, "s1", 5.0)["output"], "rb") as f:
+        assert f.read() == b"GIF89a"
+    cache.store(DIGEST, "s1", 4.0, params(6))
+    assert cache.lookup(DIGEST, "s1", 4.0)["output"] is None
+
+
+def test_nearest_picks_the_largest_result_that_still_fits(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.store(DIGEST, "s1", 4.0, params(3_900_000))
+    cache.store(DIGEST, "s1", 4.5, params(4_400_000))
+    cache.store(DIGEST, "s1", 6.0, params(5_900_000))  # Too big for a 5 MB target
+    cache.store(DIGEST, "s2", 5.0, params(4_900_000))  # Other settings
+    assert cache.nearest(DIGEST, "s1", 5_000_000)["params"]["size"] == 4_400_000
+    # Nothing within the window: a far smaller result isn't worth replaying
+    assert cache.nearest(DIGEST, "s1", 8_000_000) is None
+    assert cache.nearest("cd" * 32, "s1", 5_000_000) is None
+
+
+def test_evicts_least_recently_used_first(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    for i, target in enumerate((1.0, 2.0, 3.0)):
+        out = tmp_path / f"{i}.gif"
+        out.write_bytes(b"x" * 4000)
+        cache.store(DIGEST, "s1", target, params(1), str(out))
+        base = os.path.join(cache._dir(DIGEST), cache._name("s1", target))
+        for ext in (".json", ".gif"):
+            os.utime(base + ext, (1000 + i, 1000 + i))
+    # A hit refreshes the oldest entry, so trimming to two entries drops the 2.0 one instead
+    cache.lookup(DIGEST, "s1", 1.0)
+    cache.max_bytes = 10_000
+    cache.evict()
+    assert cache.lookup(DIGEST, "s1", 1.0) is not None
+    assert cache.lookup(DIGEST, "s1", 2.0) is None
+    assert cache.lookup(DIGEST, "s1", 3.0) is not None
+
+
+def test_settings_key_ignores_everything_but_the_output():
+    config = OptimizeConfig()
+    key = settings_key(config, QUALITY_PRESETS)
+    assert settings_key(replace(config, target_mb=3.0, threads=2, output_dir="x", speculative=4),
+                        QUALITY_PRESETS) == key
+    assert settings_key(replace(config, preset="Balanced"), QUALITY_PRESETS) != key
+    assert settings_key(replace(config, vfr=not config.vfr), QUALITY_PRESETS) != key
@@ -0,0 +1,40 @@
+from witch_gif.engine import build_prefilters, delay_runs, MAX_DELAY_RUNS, OptimizeConfig
+
+
+def test_constant_rate_is_one_run():
+    assert delay_runs([i / 10 for i in range(20)], 10) == [[0, 19, 10]]
+
+
+def test_merged_duplicates_show_longer():
+    # Frames 2-4 were duplicates of frame 1 and got dropped: frame 1 holds for 0.4 s
+    timestamps = [0.0, 0.1, 0.5, 0.6]
+    assert delay_runs(timestamps, 10) == [[0, 0, 10], [1, 1, 40], [2, 3, 10]]
+
+
+def test_rounding_follows_the_clock():
+    # 30 fps doesn't divide into centiseconds; delays alternate but never drift
+    runs = delay_runs([i / 30 for i in range(31)], 30)
+    total = sum((last - first + 1) * delay for first, last, delay in runs)
+    assert total == round(31 / 30 * 100)
+    assert {delay for _, _, delay in runs} <= {3, 4}
+
+
+def test_no_zero_delays():
+    assert delay_runs([0.0, 0.001, 0.002], 100) == [[0, 2, 1]]
+
+
+def test_long_30fps_clip_has_too_many_runs():
+    # 3/4 cs alternate, so runs grow with the frame count rather than with timing changes
+    assert len(delay_runs([i / 30 for i in range(90 * 30)], 30)) > MAX_DELAY_RUNS
+
+
+def test_empty():
+    assert delay_runs([], 10) == []
+
+
+def test_vfr_caps_the_rate_without_resampling():
+    analysis = {"motion_level": "low"}
+    vfr = build_prefilters(OptimizeConfig(vfr=True), 15, 30, analysis, 0)
+    cfr = build_prefilters(OptimizeConfig(vfr=False), 15, 30, analysis, 0)
+    assert "fps=" not in vfr and "prev_selected_t" in vfr
+    assert "fps=15.00" in cfr
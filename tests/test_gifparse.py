@@ -0,0 +1,77 @@
+import struct
+
+import pytest
+
+from witch_gif.gifparse import GifFormatError, parse_gif, parse_gif_bytes
+
+
+def make_gif(delays_cs, loop=0, local_colors=False):
+    """A tiny 2x2 animated GIF with one frame per delay (in centiseconds)."""
+    data = bytearray(b"GIF89a")
+    data += struct.pack("<HHBBB", 2, 2, 0x80, 0, 0)  # Global table, 2 colours
+    data += b"\x00\x00\x00\xff\xff\xff"
+    if loop is not None:
+        data += b"\x21\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loop) + b"\x00"
+    for delay in delays_cs:
+        data += b"\x21\xf9\x04" + struct.pack("<BHB", 0x09, delay, 1) + b"\x00"  # Disposal 2, transparent 1
+        data += b"\x2c" + struct.pack("<HHHHB", 0, 0, 2, 2, 0x80 if local_colors else 0)
+        if local_colors:
+            data += b"\x00\x00\x00\xff\xff\xff"
+        data += b"\x02\x02\x44\x01\x00"  # LZW min code size, one 2-byte sub-block, terminator
+    data += b"\x3b"
+    return bytes(data)
+
+
+def test_delays_loop_and_frame_fields():
+    info = parse_gif_bytes(make_gif([4, 10, 25], loop=3))
+    assert (info.width, info.height, info.global_colors) == (2, 2, 2)
+    assert info.loop_count == 3
+    assert info.frame_count == 3
+    assert [f.delay_cs for f in info.frames] == [4, 10, 25]
+    assert info.delays == [0.04, 0.1, 0.25]
+    assert info.duration == pytest.approx(0.39)
+    assert info.frames[0].disposal == 2
+    assert info.frames[0].transparent_index == 1
+    assert info.frame_bytes == [2, 2, 2]
+
+
+def test_browser_delay_clamp():
+    info = parse_gif_bytes(make_gif([0, 1, 2]))
+    assert info.delays == [0.1, 0.1, 0.02]
+
+
+def test_no_netscape_block_means_no_loop_count():
+    assert parse_gif_bytes(make_gif([5], loop=None)).loop_count is None
+
+
+def test_local_colour_tables():
+    info = parse_gif_bytes(make_gif([5, 5], local_colors=True))
+    assert [f.local_colors for f in info.frames] == [2, 2]
+
+
+def test_truncated_file_keeps_complete_frames():
+    data = make_gif([5, 5, 5])
+    info = parse_gif_bytes(data[:-10])  # Cut inside the last frame
+    assert 2 <= info.frame_count <= 3
+    assert [f.delay_cs for f in info.frames[:2]] == [5, 5]
+
+
+def test_truncated_before_any_frame():
+    data = make_gif([5])
+    with pytest.raises(GifFormatError):
+        parse_gif_bytes(data[:30])
+
+
+def test_not_a_gif():
+    with pytest.raises(GifFormatError):
+        parse_gif_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 20)
+
+
+def test_parse_gif_reads_files(tmp_path):
+    path = tmp_path / "a.gif"
+    path.write_bytes(make_gif([7, 7]))
+    assert parse_gif(str(path)).delays == [0.07, 0.07]
+    tiny = tmp_path / "tiny.gif"
+    tiny.write_bytes(b"GIF89a")
+    with pytest.raises(GifFormatError):
+        parse_gif(str(tiny))
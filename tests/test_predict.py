@@ -0,0 +1,72 @@
+import math
+
+from witch_gif.predict import MIN_SAMPLES, SizePredictor
+
+FEATURES = [
+    {"log_size": math.log(size), "log_frames": math.log(frames), "log_pixels": math.log(640 * 360),
+     "bpp_mean": bpp, "bpp_std": bpp / 4, "complexity": complexity, "motion": motion}
+    for size, frames, bpp, complexity, motion in [
+        (30e6, 300, 0.4, 0.5, 0.03),
+        (12e6, 150, 0.3, 0.3, 0.01),
+        (60e6, 600, 0.5, 0.7, 0.08),
+        (20e6, 240, 0.2, 0.4, 0.05),
+    ]
+]
+
+
+def true_size(features, scale_ratio, fps_ratio, lossy, colors):
+    """Bytes out the way gifsicle roughly behaves: area, frame rate and an exponential lossy falloff."""
+    return (math.exp(features["log_size"]) * 0.6 * scale_ratio ** 2 * fps_ratio * math.exp(-lossy / 70)
+            * (colors / 256) ** 0.3)
+
+
+def train(tmp_path, files=FEATURES):
+    predictor = SizePredictor(str(tmp_path))
+    for i, features in enumerate(files):
+        attempts = [{"scale_ratio": s, "fps_ratio": f, "lossy": lossy, "colors": c,
+                     "size": true_size(features, s, f, lossy, c)}
+                    for s in (0.4, 0.7, 1.0) for f in (0.5, 1.0) for lossy, c in ((15, 256), (60, 208), (120, 160))]
+        predictor.record(f"file{i}", features, attempts)
+    return predictor
+
+
+def test_untrained_predicts_nothing(tmp_path):
+    predictor = SizePredictor(str(tmp_path))
+    assert not predictor.load()
+    assert predictor.predict(FEATURES[0], 1.0, 1.0, 40, 256) is None
+    assert predictor.seed(FEATURES[0], 1.0, 256, 5e6, 15, 160) is None
+
+
+def test_needs_several_files(tmp_path):
+    predictor = train(tmp_path, FEATURES[:2])
+    assert predictor.samples == 0 and not predictor.load()
+
+
+def test_fit_tracks_the_measured_sizes(tmp_path):
+    predictor = train(tmp_path)
+    assert predictor.load() and predictor.samples >= MIN_SAMPLES
+    # Ridge and a quadratic in lossy: close to the curve, not exact
+    for features in FEATURES:
+        for args in ((0.5, 1.0, 40, 256), (0.9, 0.5, 90, 208)):
+            assert abs(predictor.predict(features, *args) / true_size(features, *args) - 1) < 0.25
+
+
+def test_seed_lands_under_target(tmp_path):
+    predictor = train(tmp_path)
+    predictor.load()
+    features, target = FEATURES[0], 5e6
+    ratio, lossy = predictor.seed(features, 1.0, 256, target, 15, 160)
+    assert predictor.predict(features, ratio, 1.0, lossy, 256) <= target
+    assert true_size(features, ratio, 1.0, lossy, 256) <= target * 1.25
+    # A roomier target seeds a bigger (or equally big but cleaner) encode
+    bigger, cleaner = predictor.seed(features, 1.0, 256, target * 3, 15, 160)
+    assert (bigger, -cleaner) >= (ratio, -lossy)
+
+
+def test_refits_when_samples_change(tmp_path):
+    predictor = train(tmp_path)
+    predictor.load()
+    before = predictor.samples
+    train(tmp_path, FEATURES[:1])
+    fresh = SizePredictor(str(tmp_path))
+    assert fresh.load() and fresh.samples > before
@@ -0,0 +1,51 @@
+import pytest
+
+from witch_gif.progress import ProgressEvent, ProgressTracker
+
+BLOCK = """frame=120
+fps=59.8
+out_time_us=4000000
+out_time=00:00:04.000000
+speed=2.0x
+progress=continue
+"""
+
+
+def feed(on_line, text):
+    for line in text.splitlines(keepends=True):
+        on_line(line)
+
+
+def test_one_event_per_block():
+    events = []
+    on_line = ProgressTracker(events.append, duration=10).watch("render")
+    feed(on_line, BLOCK)
+    feed(on_line, BLOCK.replace("frame=120", "frame=300").replace("4000000", "10000000")
+         .replace("continue", "end"))
+    assert [(e.stage, e.frame, e.out_time, e.done) for e in events] == [
+        ("render", 120, 4.0, False), ("render", 300, 10.0, True)]
+    assert events[0].fraction == pytest.approx(0.4)
+    assert events[1].eta == 0.0
+
+
+def test_stage_duration_overrides_the_tracker():
+    events = []
+    tracker = ProgressTracker(events.append, duration=10)
+    feed(tracker.watch("excerpt", duration=2), BLOCK)
+    assert events[0].fraction == 1.0
+
+
+def test_missing_values_before_the_first_frame():
+    events = []
+    feed(ProgressTracker(events.append).watch("palette"), "frame=0\nout_time_us=N/A\nbogus line\nprogress=continue\n")
+    event = events[0]
+    assert (event.frame, event.out_time) == (0, 0.0)
+    assert event.fraction is None and event.eta is None
+
+
+def test_rates_and_eta():
+    event = ProgressEvent(stage="render", frame=100, out_time=5.0, duration=20.0, elapsed=2.0)
+    assert event.fps == 50.0
+    assert event.speed == 2.5
+    assert event.eta == pytest.approx(6.0)
+    assert "ETA 6s" in event.summary
@@ -0,0 +1,44 @@
+import pytest
+
+from witch_gif.engine import excerpt_segments
+from witch_gif.proxy import PROXY_MIN_SECONDS, PROXY_SECONDS, PROXY_SEGMENT, plan_proxy
+
+
+def test_short_clips_are_searched_directly():
+    assert plan_proxy(None) is None
+    assert plan_proxy(PROXY_MIN_SECONDS - 1) is None
+
+
+def test_excerpt_samples_evenly_across_the_clip():
+    plan = plan_proxy(120)
+    assert plan.segment == PROXY_SEGMENT
+    assert plan.period == pytest.approx(24)
+    assert plan.seconds == pytest.approx(PROXY_SECONDS)
+    assert plan.ratio == pytest.approx(12)
+
+
+def test_ratio_matches_the_footage_kept():
+    for duration in (30, 47.3, 95.5, 600):
+        plan = plan_proxy(duration)
+        assert plan.seconds <= PROXY_SECONDS + 1e-9
+        assert plan.seconds * plan.ratio == pytest.approx(duration)
+
+
+def test_filter_keeps_each_run_and_closes_the_gaps():
+    assert plan_proxy(120).filter == ("select='lt(mod(t,24.000),2.000)',"
+                                      "setpts='PTS-floor(T/24.000)*22.000/TB'")
+
+
+def test_scene_cuts_move_onto_the_excerpt_timeline():
+    plan = plan_proxy(120)  # 2 s kept out of every 24 s
+    segments = [(0.0, 30.0), (30.0, 43.0), (73.0, None)]
+    # 30 s falls in a gap and is dropped; 73 s is 1 s into the fourth run
+    assert excerpt_segments(segments, plan) == [(0.0, 7.0), (7.0, None)]
+
+
+def test_excerpt_cuts_closer_than_min_segment_merge():
+    plan = plan_proxy(120)
+    segments = [(0.0, 48.5), (48.5, 0.7), (49.2, None)]
+    assert excerpt_segments(segments, plan) == [(0.0, 4.5), (4.5, None)]
+    assert excerpt_segments([(0.0, 30.0), (30.0, None)], plan) is None
+    assert excerpt_segments(None, plan) is None
@@ -0,0 +1,82 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from witch_gif import quantize
+
+
+def histogram_of(*frames):
+    histogram = quantize.Histogram()
+    for frame in frames:
+        histogram.add(frame)
+    return histogram
+
+
+def flat_blocks(colours, size=8):
+    """One frame made of solid size x size blocks, one per colour."""
+    return np.concatenate([np.full((size, size, 3), c, dtype=np.uint8) for c in colours], axis=1)
+
+
+def test_median_cut_recovers_a_few_distinct_colours():
+    colours = [(0, 0, 0), (255, 255, 255), (255, 0, 0), (0, 0, 255)]
+    palette = quantize.median_cut(histogram_of(flat_blocks(colours)), 16)
+    assert len(palette) == len(colours)  # Never invents colours it can't split further
+    for colour in colours:
+        # Within half a histogram bin of the real colour
+        assert np.abs(palette.astype(int) - colour).max(axis=1).min() <= 4
+
+
+def test_median_cut_respects_the_colour_budget():
+    frame = np.random.default_rng(0).integers(0, 256, (64, 64, 3)).astype(np.uint8)
+    for colors in (2, 16, 255):
+        palette = quantize.median_cut(histogram_of(frame), colors)
+        assert palette.dtype == np.uint8 and palette.shape[1] == 3
+        assert 1 <= len(palette) <= colors
+
+
+def test_output_uses_only_palette_colours():
+    rng = np.random.default_rng(1)
+    frames = rng.integers(0, 256, (2, 16, 20, 3)).astype(np.uint8)
+    palette = quantize.median_cut(histogram_of(*frames), 16)
+    lut = quantize.nearest_lut(palette)
+    allowed = {tuple(c) for c in palette.tolist()}
+    for method in sorted(quantize.DITHERS):
+        out = quantize.dither(frames, palette, lut, method)
+        assert out.shape == frames.shape
+        assert {tuple(c) for c in out.reshape(-1, 3).tolist()} <= allowed
+
+
+@pytest.mark.parametrize("method", sorted(quantize.KERNELS))
+def test_wavefront_diffusion_matches_a_scanline_reference(method):
+    rng = np.random.default_rng(2)
+    image = rng.integers(0, 256, (1, 9, 13, 3)).astype(np.uint8)
+    palette = rng.integers(0, 256, (8, 3)).astype(np.uint8)
+    lut = quantize.nearest_lut(palette)
+    kernel, divisor = quantize.KERNELS[method]
+
+    # Plain raster-order error diffusion, dropping error that falls off the image
+    work = image[0].astype(np.float32)
+    h, w = work.shape[:2]
+    expected = np.zeros((h, w), dtype=int)
+    for y in range(h):
+        for x in range(w):
+            value = work[y, x].copy()
+            index = quantize._lookup(value, lut)
+            expected[y, x] = index
+            error = value - palette[index].astype(np.float32)
+            for dy, dx, weight in kernel:
+                if 0 <= y + dy < h and 0 <= x + dx < w:
+                    work[y + dy, x + dx] += error * weight / divisor
+
+    assert (quantize._diffuse(image, palette, lut, kernel, divisor)[0] == expected).all()
+
+
+def test_temporal_hold_keeps_small_drift():
+    hold = quantize.TemporalHold(4)
+    first = np.full((1, 2, 2, 3), 100, dtype=np.uint8)
+    drift = first + 3
+    jump = first + 50
+    out = hold.apply(np.concatenate([first, drift, jump]),
+                     np.concatenate([first, drift, jump]))
+    assert (out[1] == out[0]).all()  # Within tolerance: held
+    assert (out[2] == jump[0]).all()  # Past it: refreshed
@@ -0,0 +1,74 @@
+import math
+
+from witch_gif.engine import FIT_WINDOW, LOSSY_STEP, _next_probes, search_lossy
+
+FLOOR, CEILING, TARGET = 15, 160, 5_000_000
+
+
+def fake_encoder(full_size, rounds=None):
+    """measure() whose size falls exponentially with lossy, like gifsicle."""
+    def measure(lossies):
+        if rounds is not None:
+            rounds.append(list(lossies))
+        return {lossy: full_size * math.exp(-lossy / 70) for lossy in lossies}
+    return measure
+
+
+def check_fit(fit, sizes):
+    assert sizes[fit] <= TARGET
+    # Either close enough under target, at the quality floor, or bracketed tightly by a miss
+    tight = any(size > TARGET and fit - lossy <= LOSSY_STEP for lossy, size in sizes.items())
+    assert fit == FLOOR or sizes[fit] >= TARGET * FIT_WINDOW or tight
+
+
+def test_finds_a_tight_fit_in_a_few_rounds():
+    for full_size in (6e6, 12e6, 40e6):
+        for width in (1, 3):
+            rounds = []
+            fit, sizes = search_lossy(fake_encoder(full_size, rounds), FLOOR, 40, CEILING, TARGET, width)
+            check_fit(fit, sizes)
+            assert len(rounds) <= 8
+
+
+def test_everything_fits_returns_the_floor():
+    fit, sizes = search_lossy(fake_encoder(1e6), FLOOR, 40, CEILING, TARGET)
+    assert fit == FLOOR
+
+
+def test_nothing_fits_stops_at_the_ceiling():
+    rounds = []
+    fit, sizes = search_lossy(fake_encoder(1e12, rounds), FLOOR, 40, CEILING, TARGET)
+    assert fit is None
+    assert CEILING in sizes
+    assert len(rounds) == 2
+
+
+def test_failed_encode_stops_the_search():
+    fit, sizes = search_lossy(lambda lossies: {}, FLOOR, 40, CEILING, TARGET)
+    assert (fit, sizes) == (None, {})
+
+
+def test_never_measures_a_level_twice():
+    seen = []
+
+    def measure(lossies):
+        seen.extend(lossies)
+        return fake_encoder(20e6)(lossies)
+
+    search_lossy(measure, FLOOR, 40, CEILING, TARGET, width=4)
+    assert len(seen) == len(set(seen))
+
+
+def test_speculative_probes_hug_the_estimate():
+    sizes = {106: 6e6, 142: 4.9e6}
+    probes = _next_probes(142, 106, sizes, FLOOR, CEILING, TARGET, 4)
+    assert len(probes) == len(set(probes)) <= 4
+    assert all(106 < p < 142 for p in probes)
+    estimate = probes[0]
+    # Extras are the closest distinct levels either side, not spread over the bracket
+    assert max(abs(p - estimate) for p in probes) <= (142 - 106) / 2
+
+
+def test_one_sided_brackets_head_for_the_far_end():
+    assert _next_probes(None, 60, {60: 9e6}, FLOOR, CEILING, TARGET, 1) == [CEILING]
+    assert _next_probes(60, None, {60: 3e6}, FLOOR, CEILING, TARGET, 1) == [FLOOR]
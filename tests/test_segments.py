@@ -0,0 +1,35 @@
+import pytest
+
+from witch_gif.engine import MAX_SEGMENTS, MIN_SEGMENT, scene_segments
+from witch_gif.probe import MediaInfo
+
+
+def clip(frames, delay=0.1):
+    return MediaInfo(width=320, height=180, frame_count=frames, delays=[delay] * frames, duration=frames * delay)
+
+
+def test_no_cuts_is_one_palette():
+    assert scene_segments({}, clip(100)) is None
+    assert scene_segments({"scene_cuts": []}, clip(100)) is None
+    assert scene_segments({"scene_cuts": [50]}, MediaInfo()) is None
+
+
+def test_splits_at_cuts():
+    segments = scene_segments({"scene_cuts": [30, 60]}, clip(100))
+    assert [start for start, _ in segments] == pytest.approx([0.0, 2.999, 5.999])
+    assert [duration for _, duration in segments[:2]] == pytest.approx([3.0, 3.0])
+    assert segments[-1][1] is None  # The last one runs to the end
+
+
+def test_short_scenes_share_a_palette():
+    # 35 is too soon after 30, 95 too close to the end, 200 past it
+    segments = scene_segments({"scene_cuts": [30, 35, 95, 200]}, clip(100))
+    assert len(segments) == 2
+    assert segments[1][0] == pytest.approx(3.0 - 0.001)
+    assert scene_segments({"scene_cuts": [5]}, clip(100)) is None
+    assert all(d is None or d >= MIN_SEGMENT for _, d in segments)
+
+
+def test_segment_count_is_capped():
+    segments = scene_segments({"scene_cuts": list(range(20, 1000, 20))}, clip(1000))
+    assert 2 <= len(segments) <= MAX_SEGMENTS
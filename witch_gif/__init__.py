@@ -0,0 +1,8 @@
+"""Headless Steam GIF optimizer engine - no Tk required."""
+from .engine import (MAX_SIZE, SAFETY_MARGIN, QUALITY_PRESETS,
+                     OptimizeConfig, Result, optimize)
+from .batch import optimize_many
+from .progress import ProgressEvent
+
+__all__ = ["MAX_SIZE", "SAFETY_MARGIN", "QUALITY_PRESETS", "OptimizeConfig", "Result", "optimize", "optimize_many",
+           "ProgressEvent"]
@@ -0,0 +1,73 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
+
+from . import quantize
+from .engine import OptimizeConfig, Result, optimize
+from .tools import kill_all
+
+
+def plan_workers(file_count, jobs=None, cores=None, in_process=False):
+    """Split the cores between files in flight and ffmpeg threads per file.
+
+    GIF decode and paletteuse are mostly single-threaded, so by default every
+    core gets its own file. With fewer files than cores the spare cores are
+    handed to each ffmpeg child instead, so files x threads never exceeds
+    the core count. in_process means files also dither in this process (the
+    native quantizer); all of that shares one GIL, so a core is kept back for
+    it and only the rest is split between the children.
+    """
+    cores = cores or os.cpu_count() or 1
+    children = max(1, cores - 1) if in_process else cores
+    jobs = jobs or children
+    jobs = max(1, min(jobs, file_count or 1))
+    threads = max(1, children // jobs)
+    return jobs, threads
+
+
+def optimize_many(paths, config=None, jobs=None, on_result=None, detail=None, cancelled=None, events=None):
+    """Optimize many GIFs at once on a core-sized worker pool.
+
+    Most of the work happens in ffmpeg/gifsicle child processes, which a
+    thread pool keeps busy. Not all of it: the motion analysis runs here too
+    (NumPy, largely outside the GIL), and so does the native quantizer's
+    dithering, which holds the GIL and doesn't scale with jobs. With that on,
+    plan_workers keeps a core back for this process. on_result(result)
+    fires as each file finishes, detail(path, text) forwards per-file status
+    lines and events(path, ProgressEvent) ffmpeg throughput. Results are
+    returned in input order.
+    """
+    config = config or OptimizeConfig()
+    cancelled = cancelled or (lambda: False)
+    native = config.quantizer == "native" and quantize.available()
+    jobs, threads = plan_workers(len(paths), jobs, in_process=native)
+    # Respect an explicit per-file budget, otherwise share the cores out
+    config = replace(config, threads=config.threads or threads)
+
+    def work(path):
+        if cancelled():
+            return Result(input_path=path, cancelled=True, message="Cancelled")
+        file_detail = (lambda text: detail(path, text)) if detail else None
+        file_events = (lambda event: events(path, event)) if events else None
+        return optimize(path, config, detail=file_detail, cancelled=cancelled, events=file_events)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="witch-gif") as pool:
+        futures = {pool.submit(work, path): path for path in paths}
+        try:
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = Result(input_path=path, message=f"Error: {e}")
+                results[path] = result
+                if on_result:
+                    on_result(result)
+        except KeyboardInterrupt:
+            # Tools run in their own process groups and never see Ctrl+C;
+            # kill them so the pool can wind down instead of waiting
+            kill_all()
+            raise
+
+    return [results[path] for path in paths]
@@ -0,0 +1,168 @@
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from dataclasses import replace
+
+from .cache import default_cache_dir
+from .engine import QUALITY_PRESETS, OptimizeConfig, optimize
+from .probe import probe
+from .quality import compare
+from .tools import FFMPEG, run
+
+CORPUS_VERSION = 1
+
+# name -> (lavfi source, seconds, what it exercises). Every source is deterministic.
+CORPUS = {
+    "static": ("smptebars=size=480x270:rate=15", 4, "no motion at all"),
+    "low_motion": ("testsrc2=size=480x270:rate=15", 6, "small moving elements on a still background"),
+    "high_motion": ("mandelbrot=size=480x270:rate=20", 5, "every pixel changes every frame"),
+    "noise": ("testsrc=size=480x270:rate=20,noise=alls=40:allf=t+u", 5, "grain, the worst case for LZW"),
+    "long": ("testsrc2=size=320x180:rate=15", 60, "long clip, exercises the excerpt search"),
+    "huge": ("testsrc2=size=1920x1080:rate=12", 5, "full-HD frames, mostly scale-bound"),
+}
+QUICK = ("static", "low_motion", "high_motion", "noise")
+
+
+def corpus_dir():
+    return os.path.join(default_cache_dir(), f"bench_corpus_v{CORPUS_VERSION}")
+
+
+def make_corpus(names, folder=None, log=print):
+    """Generate (or reuse) the corpus GIFs. Returns {name: path}."""
+    folder = folder or corpus_dir()
+    os.makedirs(folder, exist_ok=True)
+    paths = {}
+    for name in names:
+        source, seconds, _ = CORPUS[name]
+        path = os.path.join(folder, f"{name}.gif")
+        if not os.path.exists(path):
+            log(f"🎨 Generating {name}.gif ({seconds}s of {source.split('=')[0]})...")
+            temp = path + ".tmp.gif"
+            cmd = [FFMPEG, "-y", "-loglevel", "error", "-f", "lavfi", "-i", source, "-t", str(seconds),
+                   "-filter_complex", "split[a][b];[a]palettegen[p];[b][p]paletteuse", temp]
+            result = run(cmd, timeout=600, stage="corpus", text=True, errors="ignore")
+            if result.returncode or not os.path.exists(temp):
+                raise RuntimeError(f"Could not generate {name}.gif: {result.stderr.strip()[:200]}")
+            os.replace(temp, path)
+        paths[name] = path
+    return paths
+
+
+def git_revision():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def bench_one(path, preset, config, out_dir):
+    """Optimize one corpus file with one preset and measure the outcome."""
+    config = replace(config, preset=preset, output_dir=out_dir)
+    started = time.perf_counter()
+    result = optimize(path, config)
+    wall = time.perf_counter() - started
+
+    row = {
+        "file": os.path.splitext(os.path.basename(path))[0],
+        "preset": preset,
+        "success": result.success,
+        "attempts": result.attempts,
+        "wall": wall,
+        "original_size": result.original_size,
+        "final_size": result.final_size,
+        "scale": result.scale,
+        "fps": result.fps,
+        "lossy": result.lossy,
+        "colors": result.colors,
+        "ssim": None,
+        "psnr": None,
+        "stages": {stage: round(totals["wall"], 3)
+                   for stage, totals in (result.report or {}).get("stages", {}).items()},
+    }
+    if result.success:
+        try:
+            row["ssim"], row["psnr"] = compare(result.output_path, path, probe(path).fps, result.scale)
+        except (subprocess.TimeoutExpired, OSError):
+            pass
+        os.remove(result.output_path)
+    return row
+
+
+def load_history(results_path):
+    runs = []
+    try:
+        with open(results_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return runs
+
+
+def run_bench(names=None, presets=None, target_mb=4.95, results_path="bench_results.jsonl", log=print):
+    """Benchmark every preset over the corpus and append the run to results_path.
+
+    Caching and the learned size model are off so every run does the full
+    search from scratch. Returns (run, previous run or None).
+    """
+    names = list(names or CORPUS)
+    presets = list(presets or QUALITY_PRESETS)
+    files = make_corpus(names, log=log)
+    config = OptimizeConfig(target_mb=target_mb, cache=False, learn=False)
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="gif_bench_") as out_dir:
+        for name in names:
+            for preset in presets:
+                row = bench_one(files[name], preset, config, out_dir)
+                rows.append(row)
+                log(format_row(row))
+
+    bench = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cores)",
+        "corpus": CORPUS_VERSION,
+        "target_mb": target_mb,
+        "rows": rows,
+    }
+    previous = next((r for r in reversed(load_history(results_path))
+                     if r.get("corpus") == CORPUS_VERSION and r.get("target_mb") == target_mb), None)
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(bench) + "\n")
+    return bench, previous
+
+
+def format_row(row):
+    status = "✅" if row["success"] else "❌"
+    quality = f"SSIM {row['ssim']:.4f}" if row["ssim"] is not None else "SSIM -"
+    return (f"{status} {row['file']:<12} {row['preset']:<20} {row['attempts']:>3} attempts "
+            f"{row['wall']:>7.1f}s {row['final_size'] / (1024 * 1024):>5.2f} MB  {quality}")
+
+
+def compare_runs(current, previous):
+    """Lines describing what changed since the previous run, per file and preset."""
+    before = {(r["file"], r["preset"]): r for r in previous["rows"]}
+    lines = [f"Compared with {previous.get('revision') or '?'} from {previous['time']}:"]
+    for row in current["rows"]:
+        old = before.get((row["file"], row["preset"]))
+        if not old:
+            continue
+        wall = (row["wall"] / old["wall"] - 1) * 100 if old["wall"] else 0.0
+        size = (row["final_size"] - old["final_size"]) / 1024
+        ssim = ""
+        if row["ssim"] is not None and old.get("ssim") is not None:
+            ssim = f" SSIM {row['ssim'] - old['ssim']:+.4f}"
+        lines.append(f"   {row['file']:<12} {row['preset']:<20} attempts {row['attempts'] - old['attempts']:+d} "
+                     f"wall {wall:+.0f}% size {size:+.0f} KB{ssim}"
+                     + ("" if row["success"] == old["success"] else
+                        (" (now succeeds)" if row["success"] else " (now FAILS)")))
+    return lines
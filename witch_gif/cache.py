@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import asdict
+
+CACHE_VERSION = 1
+
+# Settings that only change where/how fast we work, not what comes out
+_IGNORED_FIELDS = {"output_dir", "threads", "cache", "cache_dir", "cache_max_mb", "cache_outputs", "learn",
+                   "speculative", "proxy", "report_dir", "trace"}
+
+
+def default_cache_dir():
+    """Per-user cache folder (LOCALAPPDATA on Windows, XDG cache elsewhere)."""
+    if os.name == 'nt':
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "WitchGIFOptimizer", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "witch-gif")
+
+
+def file_digest(path):
+    """SHA-256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_key(config, presets):
+    """Hash of everything that shapes the output except the target size."""
+    settings = {k: v for k, v in asdict(config).items() if k not in _IGNORED_FIELDS and k != "target_mb"}
+    settings["preset_params"] = presets.get(config.preset)
+    settings["version"] = CACHE_VERSION
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class ResultCache:
+    """On-disk cache of winning parameters (and optionally outputs) per input.
+
+    Layout: <root>/<digest[:2]>/<digest>/<settings>_<target>.json plus a
+    matching .gif when outputs are kept. Entries are touched on every hit
+    and the least recently used ones are evicted once the cache grows past
+    max_bytes.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, root=None, max_bytes=512 * 1024 * 1024):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _dir(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _name(self, settings, target_mb):
+        return f"{settings}_{target_mb:.3f}"
+
+    def lookup(self, digest, settings, target_mb):
+        """Entry for exactly these settings and target, or None."""
+        base = os.path.join(self._dir(digest), self._name(settings, target_mb))
+        entry = self._load(base + ".json")
+        if entry is None:
+            return None
+        output = base + ".gif"
+        entry["output"] = output if os.path.exists(output) else None
+        self._touch(base)
+        return entry
+
+    def nearest(self, digest, settings, target_bytes, window=0.85):
+        """Entry from a neighbouring target whose result also fits this one.
+
+        Only results between window * target and target qualify, so a
+        replay doesn't hand back something far smaller than it needs to be.
+        """
+        folder = self._dir(digest)
+        if not os.path.isdir(folder):
+            return None
+
+        best = None
+        for name in os.listdir(folder):
+            if not (name.startswith(settings + "_") and name.endswith(".json")):
+                continue
+            entry = self._load(os.path.join(folder, name))
+            if not entry:
+                continue
+            size = entry.get("params", {}).get("size", 0)
+            if window * target_bytes <= size <= target_bytes:
+                if best is None or size > best["params"]["size"]:
+                    best = entry
+                    best["_base"] = os.path.join(folder, name[:-5])
+
+        if best:
+            self._touch(best.pop("_base"))
+        return best
+
+    def store(self, digest, settings, target_mb, params, output_path=None):
+        """Record the winning params, copying the output bytes when given."""
+        folder = self._dir(digest)
+        base = os.path.join(folder, self._name(settings, target_mb))
+        try:
+            os.makedirs(folder, exist_ok=True)
+            if output_path and os.path.exists(output_path):
+                self._atomic_copy(output_path, base + ".gif")
+            self._atomic_write(base + ".json", json.dumps({"target_mb": target_mb, "params": params}))
+            self.evict()
+        except OSError:
+            pass  # A cache that can't be written is just a cache miss next time
+
+    def load_analysis(self, digest, version):
+        """Motion analysis stored for this file, or None when missing or from another version."""
+        path = os.path.join(self._dir(digest), "analysis.json")
+        analysis = self._load(path)
+        if not analysis or analysis.get("version") != version:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return analysis
+
+    def store_analysis(self, digest, analysis):
+        folder = self._dir(digest)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            self._atomic_write(os.path.join(folder, "analysis.json"), json.dumps(analysis))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits max_bytes."""
+        with self._lock:
+            files = []
+            total = 0
+            for folder, _, names in os.walk(self.root):
+                if folder == self.root:
+                    continue  # Only entry folders; other state (e.g. predictor samples) lives at the top
+                for name in names:
+                    path = os.path.join(folder, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def _load(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _touch(self, base):
+        for ext in (".json", ".gif"):
+            try:
+                os.utime(base + ext)
+            except OSError:
+                pass
+
+    def _atomic_write(self, path, text):
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp, path)
+
+    def _atomic_copy(self, src, path):
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(src, temp)
+        os.replace(temp, path)
@@ -0,0 +1,201 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+from .batch import optimize_many
+from .bench import CORPUS, QUICK, compare_runs, run_bench
+from .engine import QUALITY_PRESETS, OptimizeConfig
+
+
+def collect_inputs(patterns, recursive=False):
+    """Expand files, globs and directories into a sorted, de-duplicated GIF list."""
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                matches = glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+            else:
+                matches = glob.glob(os.path.join(pattern, "*"))
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern, recursive=True)
+        else:
+            matches = [pattern]
+
+        for path in matches:
+            if path.lower().endswith(".gif") and os.path.isfile(path):
+                # Skip our own outputs so re-running a folder doesn't re-optimize them
+                if "_v064_optimized" in os.path.basename(path):
+                    continue
+                found.append(os.path.abspath(path))
+
+    return sorted(set(found))
+
+
+def config_from_args(args):
+    """Build an OptimizeConfig from parsed CLI arguments."""
+    return OptimizeConfig(
+        preset=args.preset,
+        target_mb=args.target_mb,
+        max_fps=args.fps,
+        smart_frames=not args.no_smart_frames,
+        remove_dupes=not args.keep_duplicates,
+        frame_smoothing=args.frame_smoothing,
+        adaptive_bitrate=not args.no_adaptive_bitrate,
+        never_give_up=not args.give_up,
+        output_dir=args.output_dir,
+        threads=args.threads,
+        single_pass=not args.two_pass,
+        intermediate=not args.no_intermediate,
+        quantizer=args.quantizer,
+        palettes=args.palettes,
+        vfr=not args.cfr,
+        delta_tolerance=args.delta_tolerance,
+        cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        learn=not args.no_learn,
+        speculative=max(1, args.speculative),
+        proxy=not args.no_proxy,
+        quality=not args.no_quality,
+        report_dir=args.report,
+        trace=args.trace,
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="witch-gif", description="Headless Steam GIF optimizer")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    opt = commands.add_parser("optimize", help="Optimize GIF files, globs or whole folders")
+    opt.add_argument("inputs", nargs="+", help="GIF files, glob patterns or directories")
+    opt.add_argument("-r", "--recursive", action="store_true", help="Descend into sub-directories")
+    opt.add_argument("-p", "--preset", default="High Motion", choices=list(QUALITY_PRESETS.keys()))
+    opt.add_argument("-t", "--target-mb", type=float, default=4.95, help="Target size in MB (default 4.95)")
+    opt.add_argument("--fps", type=float, default=None, help="Max FPS (default: auto)")
+    opt.add_argument("-o", "--output-dir", default=None, help="Write results here instead of next to each input")
+    opt.add_argument("--no-smart-frames", action="store_true", help="Disable smart frame selection")
+    opt.add_argument("--keep-duplicates", action="store_true", help="Don't drop duplicate frames")
+    opt.add_argument("--cfr", action="store_true",
+                     help="Resample to a constant frame rate instead of merging repeated frames into longer delays")
+    opt.add_argument("--frame-smoothing", action="store_true", help="Interpolate when reducing FPS a lot")
+    opt.add_argument("--no-adaptive-bitrate", action="store_true", help="Disable denoise/adaptive colors")
+    opt.add_argument("--give-up", action="store_true", help="Stop after 15 attempts instead of 50")
+    opt.add_argument("--two-pass", action="store_true",
+                     help="Separate palettegen/paletteuse runs (lower memory on very long clips)")
+    opt.add_argument("--no-intermediate", action="store_true",
+                     help="Re-decode the source every render instead of caching a lossless copy")
+    opt.add_argument("--quantizer", default="ffmpeg", choices=["ffmpeg", "native"],
+                     help="Palette and dithering backend; native needs NumPy and is much slower (default ffmpeg)")
+    opt.add_argument("--palettes", default="auto", choices=["global", "scenes", "auto"],
+                     help="One palette for the clip, one per scene, or per scene only when cuts are found "
+                          "(default auto)")
+    opt.add_argument("--delta-tolerance", type=int, default=None,
+                     help="Channel change (0-255) below which a pixel is kept from the previous frame "
+                          "(default: per preset; only used by --quantizer native)")
+    opt.add_argument("--no-cache", action="store_true", help="Ignore and don't update the result cache")
+    opt.add_argument("--cache-dir", default=None, help="Result cache folder (default: per-user cache)")
+    opt.add_argument("--no-learn", action="store_true", help="Don't record encodes or use the learned size model")
+    opt.add_argument("-j", "--jobs", type=int, default=None, help="Files in flight at once (default: CPU cores)")
+    opt.add_argument("--threads", type=int, default=None, help="ffmpeg threads per file (default: cores / jobs)")
+    opt.add_argument("--no-proxy", action="store_true",
+                     help="Search long clips at full length instead of on a short excerpt")
+    opt.add_argument("--no-quality", action="store_true",
+                     help="Keep the first fit at the highest scale instead of scoring fits with SSIM")
+    opt.add_argument("--speculative", type=int, default=1, metavar="K",
+                     help="Encode K lossy candidates at once per file and keep the best that fits (default 1)")
+    opt.add_argument("--progress", action="store_true",
+                     help="Print ffmpeg throughput (frames, fps, ETA) while encoding")
+    opt.add_argument("--report", default=None, metavar="DIR",
+                     help="Write a JSON timing report per input (wall, CPU, peak RSS, bytes per stage) to DIR")
+    opt.add_argument("--trace", action="store_true", help="With --report, also write Chrome trace files")
+    opt.add_argument("-q", "--quiet", action="store_true", help="Only print the per-file summary")
+
+    bench = commands.add_parser("bench", help="Benchmark every preset on a generated GIF corpus")
+    bench.add_argument("--quick", action="store_true", help="Skip the long and huge clips")
+    bench.add_argument("--files", nargs="+", choices=list(CORPUS), default=None, help="Corpus files to run")
+    bench.add_argument("--presets", nargs="+", choices=list(QUALITY_PRESETS), default=None, metavar="PRESET",
+                       help="Presets to run (default: all)")
+    bench.add_argument("-t", "--target-mb", type=float, default=4.95, help="Target size in MB (default 4.95)")
+    bench.add_argument("--results", default="bench_results.jsonl",
+                       help="Append this run here and compare with the previous one (default bench_results.jsonl)")
+    return parser
+
+
+def run_optimize(args):
+    inputs = collect_inputs(args.inputs, args.recursive)
+    if not inputs:
+        print("No GIF files found.", file=sys.stderr)
+        return 2
+
+    if not 0 < args.target_mb <= 5:
+        print("Invalid target size. Enter 0.1 to 5.0", file=sys.stderr)
+        return 2
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    config = config_from_args(args)
+    done = []
+    failures = []
+
+    def report(result):
+        done.append(result)
+        prefix = f"[{len(done)}/{len(inputs)}] {os.path.basename(result.input_path)}"
+        if result.success:
+            quality = f", SSIM {result.ssim:.4f}" if result.ssim is not None else ""
+            print(f"{prefix}: ✅ {result.final_size / (1024 * 1024):.2f} MB "
+                  f"({result.compression_pct:.1f}% saved, {result.attempts} attempts{quality}) -> {result.output_path}",
+                  flush=True)
+        else:
+            failures.append(result)
+            print(f"{prefix}: ❌ {result.message}", flush=True)
+
+    def detail(path, text):
+        print(f"    {os.path.basename(path)}: {text}", file=sys.stderr)
+
+    last_shown = {}
+
+    def throughput(path, event):
+        # ffmpeg reports twice a second; once every couple of seconds per file is plenty
+        now = time.monotonic()
+        if event.done or now - last_shown.get(path, 0) >= 2:
+            last_shown[path] = now
+            print(f"    {os.path.basename(path)}: ⏱️ {event.summary}", file=sys.stderr)
+
+    try:
+        optimize_many(inputs, config, jobs=args.jobs, on_result=report,
+                      detail=None if args.quiet else detail,
+                      events=throughput if args.progress else None)
+    except KeyboardInterrupt:
+        print("Interrupted.", file=sys.stderr)
+        return 130
+
+    return 1 if failures else 0
+
+
+def run_bench_command(args):
+    names = args.files or (QUICK if args.quick else list(CORPUS))
+    try:
+        current, previous = run_bench(names, args.presets, args.target_mb, args.results)
+    except (OSError, RuntimeError) as e:
+        print(f"Benchmark needs a working FFmpeg: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("Interrupted.", file=sys.stderr)
+        return 130
+
+    failed = [r for r in current["rows"] if not r["success"]]
+    print(f"{len(current['rows']) - len(failed)}/{len(current['rows'])} reached the target; saved to {args.results}")
+    if previous:
+        print("\n".join(compare_runs(current, previous)))
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "optimize":
+        return run_optimize(args)
+    if args.command == "bench":
+        return run_bench_command(args)
+    return 2
@@ -0,0 +1,1493 @@
+import contextvars
+import hashlib
+import math
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from .cache import ResultCache, file_digest, settings_key
+from .motion import ANALYSIS_VERSION, analyze_frames
+from .predict import SizePredictor, file_features
+from .probe import probe
+from . import quantize
+from .progress import PROGRESS_ARGS, ProgressTracker
+from .proxy import MAX_VERIFY, PROXY_ACCEPT, plan_proxy
+from .quality import compare
+from .report import RunReport, activate
+from .tools import FFMPEG, GIFSICLE, Cancelled, run
+
+MAX_SIZE = 5 * 1024 * 1024  # Steam's 5 MB limit
+SAFETY_MARGIN = 0.988  # Use 98.8% of max size for safety
+
+QUALITY_PRESETS = {
+    "Ultra Motion": {"scale_factor": 1.0, "lossy_start": 8, "fps_reduction": 1.0, "dither": "floyd_steinberg", "multipass": True, "delta_tolerance": 3},
+    "High Motion": {"scale_factor": 1.0, "lossy_start": 15, "fps_reduction": 0.98, "dither": "floyd_steinberg", "multipass": True, "delta_tolerance": 4},
+    "Balanced": {"scale_factor": 0.95, "lossy_start": 25, "fps_reduction": 0.92, "dither": "sierra2_4a", "multipass": True, "delta_tolerance": 6},
+    "High Compression": {"scale_factor": 0.85, "lossy_start": 40, "fps_reduction": 0.8, "dither": "sierra2_4a", "multipass": False, "delta_tolerance": 8},
+    "Maximum Compression": {"scale_factor": 0.75, "lossy_start": 60, "fps_reduction": 0.7, "dither": "bayer", "multipass": False, "delta_tolerance": 12}
+}
+
+
+@dataclass
+class OptimizeConfig:
+    """Optimization settings - the headless twin of the GUI controls."""
+    preset: str = "High Motion"
+    target_mb: float = 4.95
+    max_fps: Optional[float] = None  # None means auto (derived from the source FPS)
+    smart_frames: bool = True
+    remove_dupes: bool = True
+    frame_smoothing: bool = False
+    adaptive_bitrate: bool = True
+    never_give_up: bool = True
+    output_dir: Optional[str] = None  # None writes next to the input
+    threads: Optional[int] = None  # ffmpeg thread budget per child, None lets ffmpeg decide
+    single_pass: bool = True  # palettegen + paletteuse in one ffmpeg graph
+    intermediate: bool = True  # Decode + pre-filter once into a lossless temp file
+    quantizer: str = "ffmpeg"  # "native" builds palettes and dithers in-process with NumPy
+    palettes: str = "auto"  # "scenes": a palette per scene, "auto": only when the analysis found cuts, "global": one
+    vfr: bool = True  # Merge repeated frames into longer delays instead of resampling to a constant rate
+    delta_tolerance: Optional[int] = None  # Native quantizer: channel change (0..255) still held; None = preset's
+    cache: bool = True  # Replay winning parameters for inputs seen before
+    cache_dir: Optional[str] = None  # None uses the per-user cache folder
+    cache_max_mb: int = 512
+    cache_outputs: bool = True  # Keep output bytes too, so exact repeats need no encode
+    learn: bool = True  # Record every encode and seed the search from the learned size model
+    speculative: int = 1  # Lossy candidates encoded side by side per search round
+    quality: bool = True  # Score fits with SSIM and keep the best-looking one, not just the first
+    report_dir: Optional[str] = None  # Write a JSON timing report per input here
+    trace: bool = False  # Also write a Chrome trace (chrome://tracing, Perfetto) next to the report
+    proxy: bool = True  # Search long clips on a short excerpt, full-length encode only for the winner
+
+    @property
+    def target_size_bytes(self):
+        return self.target_mb * 1024 * 1024 * SAFETY_MARGIN
+
+
+@dataclass
+class Result:
+    """Outcome of one optimize() call."""
+    input_path: str
+    output_path: Optional[str] = None
+    original_size: int = 0
+    final_size: int = 0
+    attempts: int = 0
+    scale: int = 0
+    fps: float = 0.0
+    lossy: int = 0
+    colors: int = 0
+    dither: str = ""
+    message: str = ""
+    cancelled: bool = False
+    ssim: Optional[float] = None  # Against the source, frame-rate aligned; None when not measured
+    psnr: Optional[float] = None
+    report: Optional[dict] = None  # RunReport.to_dict(): per-stage timings and every attempt
+
+    @property
+    def success(self):
+        return self.output_path is not None
+
+    @property
+    def compression_pct(self):
+        if not self.original_size or not self.final_size:
+            return 0.0
+        return ((self.original_size - self.final_size) / self.original_size) * 100
+
+
+def _noop(*args):
+    pass
+
+
+def ffmpeg_threads(config):
+    """Thread-limit arguments so parallel jobs don't oversubscribe the CPU."""
+    if not config.threads:
+        return []
+    return ["-filter_threads", str(config.threads), "-threads", str(config.threads)]
+
+
+def frame_timing(config):
+    """Output timing arguments: in VFR mode every kept frame keeps its own timestamp."""
+    return ["-vsync", "vfr"] if config.vfr else []
+
+
+def run_ffmpeg(cmd, timeout, cancelled=None, tracker=None, stage="render", reads=(), writes=None):
+    """Run an ffmpeg command, streaming -progress to tracker as stage when given."""
+    if tracker is None:
+        return run(cmd, timeout=timeout, cancelled=cancelled, stage=stage, reads=reads, writes=writes)
+    return run([cmd[0], *PROGRESS_ARGS, *cmd[1:]], timeout=timeout, cancelled=cancelled,
+               on_stdout=tracker.watch(stage), stage=stage, reads=reads, writes=writes)
+
+
+def enhanced_motion_analysis(input_path, cancelled=None, media=None, cache=None, digest=None):
+    """Motion, duplicate, static-region and colour statistics for the whole clip.
+
+    Uses the NumPy frame analyzer when it can, ffmpeg scene detection
+    otherwise. With a ResultCache and the file digest the frame analysis
+    is stored next to the file's cached results and reused from there.
+    """
+    if cache is not None and digest:
+        analysis = cache.load_analysis(digest, ANALYSIS_VERSION)
+        if analysis is not None:
+            return analysis
+    analysis = analyze_frames(input_path, media or probe(input_path), cancelled)
+    if analysis is None:
+        return scene_analysis(input_path, cancelled)
+    if cache is not None and digest:
+        cache.store_analysis(digest, analysis)
+    return analysis
+
+
+def scene_analysis(input_path, cancelled=None):
+    """Scene-change count over the first 8 seconds - the fallback when NumPy isn't available."""
+    try:
+        analysis = {"motion_level": "medium", "has_scenes": False, "complexity_score": 0.5}
+
+        # Scene detection
+        scene_cmd = [FFMPEG, "-y", "-loglevel", "error", "-i", input_path, "-t", "8",
+                    "-vf", "select='gt(scene,0.3)',showinfo", "-f", "null", "-"]
+
+        try:
+            result = run(scene_cmd, timeout=20, cancelled=cancelled, stage="analysis", reads=[input_path], text=True)
+            scene_count = result.stderr.count("Parsed_showinfo")
+
+            if scene_count > 6:
+                analysis["motion_level"] = "high"
+                analysis["has_scenes"] = True
+                analysis["complexity_score"] = 0.8
+            elif scene_count > 2:
+                analysis["motion_level"] = "medium"
+                analysis["complexity_score"] = 0.6
+            else:
+                analysis["motion_level"] = "low"
+                analysis["complexity_score"] = 0.3
+        except Cancelled:
+            raise
+        except:
+            pass
+
+        return analysis
+
+    except Cancelled:
+        raise
+    except Exception:
+        return {"motion_level": "medium", "has_scenes": False, "complexity_score": 0.5}
+
+
+def build_prefilters(config, max_fps, original_fps, analysis, attempt):
+    """Everything in the filter chain that runs before scaling."""
+    filters = []
+
+    # Frame rate smoothing
+    if config.frame_smoothing and max_fps < (original_fps * 0.75):
+        # Simple interpolation when reducing FPS significantly
+        filters.append(f"minterpolate=fps={max_fps:.2f}:mi_mode=blend")
+    else:
+        # Smart frame selection
+        if config.smart_frames and analysis.get("motion_level") in ["medium", "high"]:
+            if analysis.get("motion_level") == "high":
+                filters.append("select='not(mod(n,2))+gt(scene,0.15)'")
+            else:
+                threshold = 0.03 + (attempt * 0.004)
+                filters.append(f"select='gt(scene,{threshold})+not(mod(n,4))'")
+
+        # Standard duplicate removal
+        if config.remove_dupes:
+            filters.append("mpdecimate=hi=64*12:lo=64*5:frac=0.3")
+
+        # FPS control
+        if config.vfr:
+            # Cap the rate without resampling: keep the first frame of every 1/max_fps slot, so
+            # dropped duplicates stay dropped and the frame before them simply shows longer
+            filters.append(f"select='if(isnan(prev_selected_t),1,"
+                           f"gt(floor(t*{max_fps:.2f}),floor(prev_selected_t*{max_fps:.2f})))'")
+        else:
+            filters.append(f"fps={max_fps:.2f}")
+
+    # Adaptive bitrate: simple noise reduction
+    if config.adaptive_bitrate:
+        filters.append("hqdn3d=1:0.5:1:0.5")
+
+    return ",".join(filters)
+
+
+def build_scale_filter(scale):
+    """Scaling filter for a given output width."""
+    return f"scale={scale}:-2:flags=lanczos"
+
+
+def build_enhanced_filters(config, scale, max_fps, original_fps, analysis, attempt):
+    """Build enhanced filter chain."""
+    return build_prefilters(config, max_fps, original_fps, analysis, attempt) + "," + build_scale_filter(scale)
+
+
+def make_intermediate(input_path, config, prefilter, out_path, cancelled=None, tracker=None, stage="intermediate"):
+    """Decode and pre-filter the source once into a lossless FFV1/NUT file.
+
+    GIF decoding is slow and single-threaded; renders that only change the
+    scale, colors or dither start from this file instead of the original.
+    """
+    cmd = [FFMPEG, "-y", "-loglevel", "error", "-i", input_path,
+           "-vf", prefilter, *frame_timing(config), "-c:v", "ffv1", *ffmpeg_threads(config), "-f", "nut", out_path]
+
+    try:
+        run_ffmpeg(cmd, 180, cancelled, tracker, stage, [input_path], out_path)
+    except subprocess.TimeoutExpired:
+        return False
+    return os.path.exists(out_path) and os.path.getsize(out_path) > 0
+
+
+# Output names handed out but not written yet, so parallel jobs never collide
+_reserved_outputs = set()
+_reserved_lock = threading.Lock()
+
+
+def output_path_for(input_path, output_dir=None):
+    """Reserve a free '<name>_v064_optimized[_N].gif' path."""
+    folder = output_dir or os.path.dirname(input_path)
+    base = os.path.splitext(os.path.basename(input_path))[0]
+    output_path = os.path.join(folder, f"{base}_v064_optimized.gif")
+
+    with _reserved_lock:
+        counter = 1
+        while os.path.exists(output_path) or output_path in _reserved_outputs:
+            output_path = os.path.join(folder, f"{base}_v064_optimized_{counter}.gif")
+            counter += 1
+        _reserved_outputs.add(output_path)
+    return output_path
+
+
+def release_output_path(output_path):
+    """Hand a reserved output name back."""
+    with _reserved_lock:
+        _reserved_outputs.discard(output_path)
+
+
+def write_atomic(path, data):
+    """Write data (bytes or a spilled output's path) to path via a hidden temp file in the same folder,
+    so path is never half-written."""
+    fd, temp = tempfile.mkstemp(prefix=".", suffix=".part", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(data, str):
+                with open(data, "rb") as source:
+                    shutil.copyfileobj(source, f)
+            else:
+                f.write(data)
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+
+# Search bounds
+LOSSY_MAX = 160    # Past this gifsicle output degrades faster than it shrinks
+LOSSY_STEP = 4     # Stop bisecting once the lossy bracket is this tight
+MIN_SCALE = 120
+SCALE_STEP = 16    # Smallest scale change worth another encode
+FIT_WINDOW = 0.97  # Within 3% under target is as close as we need to get
+QUALITY_FRAMES = 100  # Frames compared when scoring a fit against the source
+QUALITY_EXPLORE = 3  # Smaller scales tried while SSIM keeps improving
+EXPLORE_STEP = 0.9  # Scale factor per exploration step
+EXPLORE_LOSSY = 30  # How much less lossy each exploration step starts from
+
+
+def _even(value):
+    value = int(value)
+    return value - 1 if value % 2 == 1 else value
+
+
+def _secant_scale(scale, size, target):
+    """Scale that should land on target, assuming size grows with width^2."""
+    ratio = max(0.2, min(4.0, (target * (1 + FIT_WINDOW) / 2) / size))
+    return int(scale * ratio ** 0.5)
+
+
+def _quality_key(params):
+    """Higher is better: keep frames first, then resolution, then less lossy."""
+    return (params["fps"], params["scale"], -params["lossy"])
+
+
+def _quality_rank(params):
+    """Higher is better: measured SSIM when there is one, the heuristic key otherwise."""
+    ssim = params.get("ssim")
+    return (ssim is not None, ssim or 0.0, _quality_key(params))
+
+
+def measure_quality(output, input_path, media, width, cancelled=None):
+    """(ssim, psnr) of an output (path or GIF bytes) against its source, on about QUALITY_FRAMES sampled frames."""
+    every = max(1, media.frame_count // QUALITY_FRAMES)
+    try:
+        return compare(output, input_path, media.fps, width, every=every, cancelled=cancelled)
+    except (subprocess.TimeoutExpired, OSError):
+        return None, None
+
+
+def _spread(low, high, count):
+    """count evenly spaced integers from low to high inclusive."""
+    if count <= 1 or high <= low:
+        return [int(round(high))]
+    return [int(round(low + (high - low) * i / (count - 1))) for i in range(count)]
+
+
+def _next_probes(fit, miss, sizes, floor, ceiling, target, width):
+    """Lossy levels to try next round, best guess first."""
+    if fit is None:
+        # Everything so far was too big: head for the ceiling
+        return _spread(miss + LOSSY_STEP, ceiling, width)[::-1] if width > 1 else [ceiling]
+    if miss is None:
+        # Everything so far fit: see how much quality we can claw back
+        return _spread(floor, fit - LOSSY_STEP, width) if width > 1 else [floor]
+
+    # Secant between the bracket ends (size falls roughly exponentially
+    # with lossy, so interpolate in log space), kept away from the edges
+    span = fit - miss
+    aim = math.log(target * (1 + FIT_WINDOW) / 2)
+    slope = (math.log(sizes[miss]) - math.log(sizes[fit])) / span
+    estimate = miss + (math.log(sizes[miss]) - aim) / slope if slope > 0 else miss + span / 2
+    margin = max(1, span // 8)
+    estimate = min(max(estimate, miss + margin), fit - margin)
+    probes = [int(round(estimate))]
+    if width > 1:
+        # Speculative extras: hedge either side of the estimate, closest first
+        step = max(1.0, span / (2 * width))
+        for k in range(1, span):
+            for side in (-1, 1):
+                probe = int(round(estimate + side * k * step))
+                if miss < probe < fit and probe not in probes:
+                    probes.append(probe)
+            if len(probes) >= width or k * step >= span:
+                break
+    return probes[:width]
+
+
+def search_lossy(measure, floor, guess, ceiling, target, width=1):
+    """Find the lowest lossy level that fits target with few encodes.
+
+    measure(lossies) encodes every level in the list (concurrently when
+    there are several) and returns {lossy: size} for those that finished;
+    an empty dict stops the search. The first round probes the guess; a miss
+    then probes the ceiling and a fit probes the floor, so the answer is
+    bracketed after two rounds. From there each round interpolates (secant)
+    between the bracket ends. With width > 1 every round also probes extra
+    levels either side of the estimate (the first round spreads them from
+    end to end to bracket at once), so fewer rounds of wall time are needed
+    at the cost of some extra encodes.
+
+    Returns (fit, sizes): the lowest fitting lossy (None if nothing fit)
+    and every size measured, keyed by lossy.
+    """
+    sizes = {}
+    fit, miss = None, None
+    guess = min(max(guess, floor), ceiling)
+    probes = [guess]
+    if width > 1:
+        # Bracket in one round: the guess, both ends and evenly spaced levels between
+        probes += _spread(floor, ceiling, width - 1)
+
+    while True:
+        probes = [p for p in dict.fromkeys(probes) if floor <= p <= ceiling and p not in sizes]
+        if not probes:
+            break
+        measured = measure(probes)
+        if not measured:
+            break
+        for lossy, size in measured.items():
+            sizes[lossy] = size
+            if size <= target:
+                fit = lossy if fit is None else min(fit, lossy)
+            else:
+                miss = lossy if miss is None else max(miss, lossy)
+
+        if fit is not None and (fit <= floor or sizes[fit] >= target * FIT_WINDOW):
+            break  # Best quality allowed, or close enough under target
+        if miss is not None and miss >= ceiling:
+            break  # Nothing fits at this scale
+        if fit is not None and miss is not None and fit - miss <= LOSSY_STEP:
+            break
+
+        probes = _next_probes(fit, miss, sizes, floor, ceiling, target, width)
+
+    return fit, sizes
+
+
+class BaseGifCache:
+    """paletteuse outputs keyed by everything ffmpeg-side, so lossy-only
+    attempts just re-run gifsicle on the already rendered GIF."""
+
+    def __init__(self, temp_dir, keep=2):
+        self.temp_dir = temp_dir
+        self.keep = keep  # Rendered GIFs can be big, only hold the latest few
+        self.entries = OrderedDict()
+        self.counter = 0
+        self.histograms = {}  # Native quantizer: (colour histogram, VFR delay runs) per source and pre-filter chain
+
+    def get(self, key):
+        path = self.entries.get(key)
+        if path and os.path.exists(path):
+            self.entries.move_to_end(key)
+            return path
+        return None
+
+    def new_path(self):
+        self.counter += 1
+        return os.path.join(self.temp_dir, f"base_{self.counter}.gif")
+
+    def put(self, key, path):
+        self.entries[key] = path
+        while len(self.entries) > self.keep:
+            _, old = self.entries.popitem(last=False)
+            if os.path.exists(old):
+                os.remove(old)
+
+
+def delta_tolerance(config):
+    """How far a pixel may drift between frames and still be kept from the previous frame."""
+    if config.delta_tolerance is not None:
+        return max(0, config.delta_tolerance)
+    return QUALITY_PRESETS.get(config.preset, {}).get("delta_tolerance", 0)
+
+
+def use_native(config, fps):
+    """Whether renders go through the NumPy quantizer. Opt-in: it dithers far slower than paletteuse."""
+    return bool(fps) and config.quantizer == "native" and quantize.available()
+
+
+HIST_WIDTH = 160  # Colour histograms are sampled at this width, every other frame
+DITHER_BATCH = 8  # Frames dithered together by the native quantizer
+PIPE_FRAMES = 16  # Decoded frames buffered ahead of the native quantizer
+
+
+def _strip_scale(filter_chain):
+    """The filter chain without its trailing scale, so colour statistics carry across scales."""
+    head, sep, _ = filter_chain.rpartition("scale=")
+    return head.rstrip(",") if sep else filter_chain
+
+
+def render_native(input_path, temp_dir, config, filter_chain, colors, dither, bayer_scale, fps, out_path,
+                  cancelled=None, histograms=None, input_args=()):
+    """Palette and dithering in-process with NumPy; ffmpeg only decodes and writes the GIF.
+
+    The palette is cut from a colour histogram sampled once per source and
+    pre-filter chain, so sweeping colors or scale never re-runs it. In VFR
+    mode that pass also reads every frame's timestamp, so a clip with more
+    delay runs than gifsicle can restore goes to ffmpeg before any dithering. Frames
+    stream decoder -> dither -> encoder through bounded queues. Pixels that
+    changed less than the delta tolerance keep the previous frame's colour,
+    so they repeat exactly: the encoder crops them away and gifsicle's -O3
+    can make them transparent. Returns True when out_path was written.
+    """
+    cancelled = cancelled or (lambda: False)
+    key = (input_path, fps, tuple(input_args), _strip_scale(filter_chain))
+    sampled = histograms.get(key) if histograms is not None else None
+    if sampled is None:
+        histogram = quantize.Histogram()
+        # showinfo sits ahead of the sampling select, so it still sees every frame
+        timing, level = ("showinfo", "info") if config.vfr else (None, "error")
+        sample = ",".join(filter(None, [key[3], timing, "select='not(mod(n,2))'",
+                                        f"scale='min(iw,{HIST_WIDTH})':-2"]))
+        cmd = [FFMPEG, "-hide_banner", "-nostats", "-loglevel", level, *input_args, "-i", input_path,
+               "-vf", sample, "-vsync", "passthrough",
+               *ffmpeg_threads(config), "-f", "image2pipe", "-c:v", "ppm", "pipe:1"]
+        result = run(cmd, timeout=120, cancelled=cancelled, on_stdout=quantize.PPMReader(histogram.add).feed,
+                     chunks=True, stage="histogram", reads=[input_path])
+        if not histogram.total:
+            return False
+        runs = len(delay_runs([float(t) for t in _PTS_TIME.findall(result.stderr.decode("utf-8", "ignore"))], fps))
+        sampled = (histogram, runs)
+        if histograms is not None:
+            histograms[key] = sampled
+    histogram, runs = sampled
+    if runs > MAX_DELAY_RUNS:
+        return False
+
+    palette = quantize.median_cut(histogram, colors - 1)  # One slot left for transparency, like palettegen
+    lut = quantize.nearest_lut(palette)
+    # paletteuse wants a 16x16 palette image; the colours are exact, so it only has to index them
+    palette_path = os.path.join(temp_dir, "palette.rgb")
+    with open(palette_path, "wb") as f:
+        f.write(palette[[min(i, len(palette) - 1) for i in range(256)]].tobytes())
+
+    frames = queue.Queue(maxsize=PIPE_FRAMES)
+    stop = threading.Event()
+    failed = []
+    timestamps = []  # VFR: when each decoded frame is shown, from showinfo
+
+    def put(frame):
+        while not stop.is_set():
+            try:
+                frames.put(frame, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def decode():
+        try:
+            chain, level = (filter_chain + ",showinfo", "info") if config.vfr else (filter_chain, "error")
+            cmd = [FFMPEG, "-hide_banner", "-nostats", "-loglevel", level, *input_args, "-i", input_path,
+                   "-vf", chain, "-vsync", "passthrough",
+                   *ffmpeg_threads(config), "-f", "image2pipe", "-c:v", "ppm", "pipe:1"]
+            result = run(cmd, timeout=300, cancelled=lambda: stop.is_set() or cancelled(),
+                         on_stdout=quantize.PPMReader(put).feed, chunks=True, stage="decode", reads=[input_path])
+            timestamps.extend(float(t) for t in _PTS_TIME.findall(result.stderr.decode("utf-8", "ignore")))
+        except (Cancelled, subprocess.TimeoutExpired, OSError) as e:
+            failed.append(e)
+        finally:
+            put(None)
+
+    decoder = threading.Thread(target=contextvars.copy_context().run, args=(decode,), daemon=True)
+    decoder.start()
+    try:
+        first = frames.get()
+        if first is None:
+            if failed:
+                raise failed[0]
+            return False
+        height, width = first.shape[:2]
+        hold = quantize.TemporalHold(delta_tolerance(config))
+        written = [0]
+
+        def dithered():
+            batch, done = [first], False
+            while not done:
+                while len(batch) < DITHER_BATCH:
+                    frame = frames.get()
+                    if frame is None:
+                        done = True
+                        break
+                    batch.append(frame)
+                if batch:
+                    written[0] += len(batch)
+                    yield hold.apply(batch, quantize.dither(batch, palette, lut, dither, bayer_scale)).tobytes()
+                batch = []
+            if failed:
+                raise failed[0]  # Decoder died: don't let the encoder finish a truncated GIF
+
+        cmd = [FFMPEG, "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-framerate", f"{fps:.2f}",
+               "-i", "pipe:0", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", "16x16", "-i", palette_path,
+               "-filter_complex", "[0:v][1:v]paletteuse=dither=none:diff_mode=rectangle", out_path]
+        run(cmd, timeout=300, cancelled=cancelled, stage="native", reads=[input_path], writes=out_path,
+            stdin=dithered())
+    finally:
+        stop.set()
+        decoder.join(timeout=5)
+    if not (os.path.exists(out_path) and os.path.getsize(out_path) > 0):
+        return False
+    # rawvideo carries no timestamps, so the encoder wrote a constant rate; put the real delays back
+    if not config.vfr:
+        return True
+    # Without one timestamp per written frame the delays can't be trusted; ffmpeg's path keeps timing itself
+    return len(timestamps) == written[0] and apply_delays(out_path, timestamps, fps, cancelled)
+
+
+_PTS_TIME = re.compile(r"pts_time:\s*(-?[\d.]+)")
+MAX_DELAY_RUNS = 1500  # Keeps the gifsicle command line well under Windows' length limit
+
+
+def delay_runs(timestamps, fps):
+    """[first, last, delay in cs] for every run of frames that share a delay, from timestamps (seconds).
+
+    The last frame shows for one frame at fps.
+    """
+    if not timestamps:
+        return []
+    ends = timestamps[1:] + [timestamps[-1] + 1 / fps]
+    # Rounded on the running clock, so centisecond rounding never drifts over a long clip
+    ticks = [round(t * 100) for t in [timestamps[0]] + ends]
+    delays = [max(1, b - a) for a, b in zip(ticks, ticks[1:])]
+
+    runs = []
+    for i, delay in enumerate(delays):
+        if runs and runs[-1][2] == delay:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i, delay])
+    return runs
+
+
+def apply_delays(gif_path, timestamps, fps, cancelled=None):
+    """Rewrite gif_path's frame delays from presentation timestamps (seconds). Returns True on success.
+
+    Runs of frames with the same delay share one --delay so the command
+    stays short.
+    """
+    if len(timestamps) < 2:
+        return bool(timestamps)
+    runs = delay_runs(timestamps, fps)
+    if len(runs) > MAX_DELAY_RUNS:
+        return False
+    cmd = [GIFSICLE, "-b", gif_path]
+    for first, last, delay in runs:
+        cmd += ["-d", str(delay), f"#{first}-{last}" if last > first else f"#{first}"]
+    result = run(cmd, timeout=60, cancelled=cancelled, stage="delays", reads=[gif_path], writes=gif_path)
+    return result.returncode == 0
+
+
+def render_base(input_path, temp_dir, config, filter_chain, colors, dither, bayer_scale, out_path, cancelled=None,
+                tracker=None, fps=None, histograms=None, segments=None, input_args=()):
+    """palettegen + paletteuse into out_path. Returns True when it was written.
+
+    With segments, each one gets its own palette (see render_segments).
+    input_args go before -i, e.g. to seek.
+    """
+    temp_palette = os.path.join(temp_dir, "palette.png")
+    for stale in (temp_palette, out_path):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    if segments and len(segments) > 1:
+        try:
+            if render_segments(input_path, temp_dir, config, filter_chain, colors, dither, bayer_scale, out_path,
+                               segments, cancelled, fps):
+                return True
+        except subprocess.TimeoutExpired:
+            pass
+        # Fall back to one palette for the whole clip
+        if os.path.exists(out_path):
+            os.remove(out_path)
+
+    if use_native(config, fps):
+        try:
+            if render_native(input_path, temp_dir, config, filter_chain, colors, dither, bayer_scale, fps, out_path,
+                             cancelled, histograms, input_args):
+                return True
+        except Cancelled:
+            raise
+        except Exception:
+            pass
+        # Anything the native path can't do falls back to ffmpeg's own palette
+        if os.path.exists(out_path):
+            os.remove(out_path)
+
+    if config.single_pass:
+        # Decode, filter and scale once; split feeds both palettegen and paletteuse
+        graph = (f"[0:v]{filter_chain},split[a][b];"
+                 f"[a]palettegen=max_colors={colors}:reserve_transparent=1[p];"
+                 f"[b][p]paletteuse=dither={dither}:bayer_scale={bayer_scale}:diff_mode=rectangle")
+        single_cmd = [FFMPEG, "-y", "-loglevel", "error", *input_args, "-i", input_path,
+                      "-filter_complex", graph, *frame_timing(config), *ffmpeg_threads(config), out_path]
+
+        try:
+            run_ffmpeg(single_cmd, 120, cancelled, tracker, "render", [input_path], out_path)
+        except subprocess.TimeoutExpired:
+            pass
+
+        if os.path.exists(out_path) and os.path.getsize(out_path) > 0:
+            return True
+        # The split has to buffer every frame until the palette is ready, which
+        # can fail on very long clips - fall back to the two-pass route
+        if os.path.exists(out_path):
+            os.remove(out_path)
+
+    # Generate palette
+    palette_cmd = [FFMPEG, "-y", "-loglevel", "error", *input_args, "-i", input_path,
+                  "-vf", filter_chain + f",palettegen=max_colors={colors}:reserve_transparent=1",
+                  *ffmpeg_threads(config), temp_palette]
+
+    run_ffmpeg(palette_cmd, 60, cancelled, tracker, "palette", [input_path], temp_palette)
+
+    if not os.path.exists(temp_palette):
+        return False
+
+    gif_cmd = [FFMPEG, "-y", "-loglevel", "error",
+              *input_args, "-i", input_path, "-i", temp_palette,
+              "-filter_complex", f"{filter_chain}[x];[x][1:v]paletteuse=dither={dither}:bayer_scale={bayer_scale}"
+                                 ":diff_mode=rectangle",
+              *frame_timing(config), *ffmpeg_threads(config), out_path]
+
+    run_ffmpeg(gif_cmd, 90, cancelled, tracker, "paletteuse", [input_path, temp_palette], out_path)
+
+    return os.path.exists(out_path)
+
+
+MIN_SEGMENT = 1.0  # Seconds; scenes shorter than this share the previous scene's palette
+MAX_SEGMENTS = 16
+
+
+def scene_segments(analysis, media):
+    """[(start, duration)] in seconds, split at the analysis' scene cuts; None when that's one segment.
+
+    The last segment's duration is None (to the end). Needs the frame
+    analyzer's scene_cuts and per-frame delays.
+    """
+    cuts = analysis.get("scene_cuts")
+    if not cuts or not media.delays:
+        return None
+    starts = [0.0]
+    for delay in media.delays:
+        starts.append(starts[-1] + delay)
+    bounds = [0.0]
+    for frame in cuts:
+        if frame >= len(media.delays):
+            continue
+        t = starts[frame]
+        if t - bounds[-1] >= MIN_SEGMENT and starts[-1] - t >= MIN_SEGMENT:
+            bounds.append(t)
+    if len(bounds) > MAX_SEGMENTS:
+        bounds = bounds[::math.ceil(len(bounds) / MAX_SEGMENTS)]
+    if len(bounds) < 2:
+        return None
+    # Start a hair early so a frame sitting exactly on a cut isn't lost between two segments
+    return [(max(0.0, start - 0.001), (end - start) if end is not None else None)
+            for start, end in zip(bounds, bounds[1:] + [None])]
+
+
+def excerpt_segments(segments, plan):
+    """The same scene segments on a ProxyPlan excerpt's timeline; cuts that fall in a gap are dropped."""
+    if not segments:
+        return None
+    bounds = []
+    for start, _ in segments:
+        period = math.floor(start / plan.period)
+        offset = start - period * plan.period
+        if offset < plan.segment:
+            bounds.append(period * plan.segment + offset)
+    bounds = [b for i, b in enumerate(bounds) if i == 0 or b - bounds[i - 1] >= MIN_SEGMENT]
+    if len(bounds) < 2:
+        return None
+    return [(start, (end - start) if end is not None else None) for start, end in zip(bounds, bounds[1:] + [None])]
+
+
+def render_segments(input_path, temp_dir, config, filter_chain, colors, dither, bayer_scale, out_path, segments,
+                    cancelled=None, fps=None):
+    """A palette per scene: render every segment on its own, in parallel, and merge them with gifsicle.
+
+    Each segment's palette only has to cover its own scene, so scene-heavy
+    clips don't spread 256 colours across everything. The cost is a local
+    colour table per frame after the first segment. Returns True when
+    out_path was written.
+    """
+    cancelled = cancelled or (lambda: False)
+    # Segments share the file's thread budget (see plan_workers), so a batch never runs more ffmpegs than cores
+    budget = config.threads or os.cpu_count() or 1
+    workers = min(len(segments), budget)
+    segment_config = replace(config, threads=max(1, budget // workers))
+    failed = threading.Event()
+    stop = lambda: failed.is_set() or cancelled()
+
+    def work(index, start, duration):
+        folder = os.path.join(temp_dir, f"segment_{index}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "segment.gif")
+        seek = ["-ss", f"{start:.3f}"] + (["-t", f"{duration:.3f}"] if duration is not None else [])
+        try:
+            if render_base(input_path, folder, segment_config, filter_chain, colors, dither, bayer_scale, path,
+                           stop, fps=fps, input_args=seek):
+                return path
+        except Cancelled:
+            pass
+        failed.set()
+        return None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, work, i, start, duration)
+                   for i, (start, duration) in enumerate(segments)]
+        parts = [future.result() for future in futures]
+    if cancelled():
+        raise Cancelled()
+    if not all(parts):
+        return False
+
+    run([GIFSICLE, "--merge", *parts, "-o", out_path], timeout=60, cancelled=cancelled, stage="merge",
+        reads=parts, writes=out_path)
+    return os.path.exists(out_path) and os.path.getsize(out_path) > 0
+
+
+SPILL_BYTES = 24 * 1024 * 1024  # Base GIFs bigger than this squeeze into temp files instead of memory
+
+
+def output_size(output):
+    """Size of a squeeze_gif output: bytes held in memory or a spilled file."""
+    return os.path.getsize(output) if isinstance(output, str) else len(output)
+
+
+def discard_output(output):
+    """Drop a squeeze_gif output that isn't kept; spilled ones are deleted."""
+    if isinstance(output, str) and os.path.exists(output):
+        os.remove(output)
+
+
+def squeeze_gif(base_gif, lossy, analysis, cancelled=None, spill_dir=None):
+    """gifsicle pass over a rendered GIF. Returns the output (bytes, or a file path) or None.
+
+    The result normally comes back on stdout, so candidates are measured in
+    memory and only the one that gets kept is ever written anywhere. When
+    the base GIF is bigger than SPILL_BYTES and spill_dir is given, the
+    output goes to a temp file there instead, so a few concurrent candidates
+    of a huge clip don't all sit in RAM.
+
+    No --colors: palettegen already capped the count, and gifsicle would
+    merge per-scene local palettes into one global table to apply it.
+    """
+    # Gifsicle with smart optimization
+    gifsicle_cmd = [GIFSICLE, "-O3", "--careful"]
+    if lossy > 0:
+        gifsicle_cmd.append(f"--lossy={int(lossy)}")
+
+    # Content-aware optimization
+    if analysis.get("motion_level") == "low":
+        gifsicle_cmd.append("--optimize=3")
+
+    gifsicle_cmd.append(base_gif)
+
+    spill = None
+    if spill_dir and os.path.getsize(base_gif) > SPILL_BYTES:
+        fd, spill = tempfile.mkstemp(prefix="attempt_", suffix=".gif", dir=spill_dir)
+        os.close(fd)
+        gifsicle_cmd.extend(["-o", spill])
+
+    try:
+        result = run(gifsicle_cmd, timeout=60, cancelled=cancelled, stage="gifsicle", reads=[base_gif],
+                     writes=spill)
+    except BaseException:
+        discard_output(spill)
+        raise
+
+    if spill:
+        if result.returncode or not os.path.getsize(spill):
+            discard_output(spill)
+            return None
+        return spill
+    if result.returncode or not result.stdout:
+        return None
+    return result.stdout
+
+
+def squeeze_speculative(base_gif, lossies, analysis, target, cancelled=None, spill_dir=None):
+    """gifsicle at several lossy levels at once.
+
+    Candidates that can no longer win are killed as results arrive:
+    anything more lossy than a fit, anything less lossy than a miss.
+    Returns {lossy: (size, output)} for the candidates that finished.
+    """
+    cancelled = cancelled or (lambda: False)
+    cancels = {lossy: threading.Event() for lossy in lossies}
+
+    def work(index, lossy):
+        stop = lambda: cancels[lossy].is_set() or cancelled()
+        try:
+            data = squeeze_gif(base_gif, lossy, analysis, stop, spill_dir)
+        except Cancelled:
+            data = None
+        return lossy, output_size(data) if data else None, data
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(lossies)) as pool:
+        # Each candidate carries the caller's context so its run lands in the same report
+        futures = [pool.submit(contextvars.copy_context().run, work, i, lossy) for i, lossy in enumerate(lossies)]
+        for future in as_completed(futures):
+            try:
+                lossy, size, data = future.result()
+            except subprocess.TimeoutExpired:
+                continue
+            if size is None:
+                continue
+            results[lossy] = (size, data)
+            for other, event in cancels.items():
+                if (size <= target and other > lossy) or (size > target and other < lossy):
+                    event.set()
+    if cancelled():
+        raise Cancelled()
+    return results
+
+
+def prepare_base(input_path, temp_dir, config, filter_chain, colors, dither, bayer_scale, bases=None,
+                 cancelled=None, tracker=None, fps=None, segments=None):
+    """Rendered base GIF for these ffmpeg-side settings, from the cache when possible.
+
+    fps is part of the key: the intermediate is rebuilt at the same path when
+    the frame rate steps down, so the path alone doesn't say what's in it.
+    """
+    key = (input_path, fps, filter_chain, colors, dither, bayer_scale)
+    base_gif = bases.get(key) if bases else None
+
+    if base_gif is None:
+        base_gif = bases.new_path() if bases else os.path.join(temp_dir, "temp.gif")
+        if not render_base(input_path, temp_dir, config, filter_chain, colors, dither, bayer_scale, base_gif,
+                           cancelled, tracker, fps, bases.histograms if bases else None, segments):
+            return None
+        if bases:
+            bases.put(key, base_gif)
+    return base_gif
+
+
+def encode_attempt(input_path, temp_dir, config, filter_chain, colors, dither, bayer_scale, lossy, analysis,
+                   bases=None, cancelled=None, tracker=None, fps=None, segments=None):
+    """One attempt: render (or reuse) the base GIF, then gifsicle. Returns the squeeze_gif output or None."""
+    base_gif = prepare_base(input_path, temp_dir, config, filter_chain, colors, dither, bayer_scale, bases,
+                            cancelled, tracker, fps, segments)
+    if base_gif is None:
+        return None
+    return squeeze_gif(base_gif, lossy, analysis, cancelled, temp_dir)
+
+
+def replay_cached(cache, digest, settings, config, input_path, temp_dir, output_path, detail, cancelled=None,
+                  tracker=None):
+    """Serve a cache hit into output_path. Returns the winning params or None.
+
+    Exact hits with stored bytes are a copy. Otherwise the cached
+    parameters (from this target or a neighbouring one whose result also
+    fits) are replayed in a single encode.
+    """
+    target = config.target_size_bytes
+    entry = cache.lookup(digest, settings, config.target_mb)
+    if entry and entry.get("output") and entry["params"]["size"] <= target:
+        detail("Identical input seen before - reusing cached output")
+        with open(entry["output"], "rb") as f:
+            write_atomic(output_path, f.read())
+        return dict(entry["params"], attempts=0)
+
+    entry = entry or cache.nearest(digest, settings, target)
+    if not entry:
+        return None
+
+    params = entry["params"]
+    detail(f"Replaying cached parameters (Scale {params['scale']}px, Lossy {params['lossy']})")
+    try:
+        data = encode_attempt(input_path, temp_dir, config,
+                              params["prefilter"] + "," + build_scale_filter(params["scale"]),
+                              params["colors"], params["dither"], params["bayer_scale"], params["lossy"],
+                              {"motion_level": params.get("motion_level")},
+                              cancelled=cancelled, tracker=tracker, fps=params["fps"],
+                              segments=params.get("segments"))
+    except (subprocess.TimeoutExpired, KeyError):
+        return None
+    if data is None or output_size(data) > target:
+        discard_output(data)
+        return None
+
+    write_atomic(output_path, data)
+    params = dict(params, size=output_size(data))
+    cache.store(digest, settings, config.target_mb, params, output_path if config.cache_outputs else None)
+    return dict(params, attempts=1)
+
+
+def optimize(input_path, config=None, progress=None, detail=None, cancelled=None, analysis=None, events=None):
+    """V0.64 optimization with conservative enhancements.
+
+    progress(value, status) and detail(text) receive the same messages the GUI
+    shows; cancelled() is polled while tools run, and turning true kills the
+    running ffmpeg/gifsicle straight away. events(ProgressEvent) receives
+    ffmpeg's own progress (frames, fps, ETA) about twice a second. Pass
+    analysis to reuse an enhanced_motion_analysis() result that was already
+    computed.
+
+    Every tool run is timed into a RunReport, returned as Result.report and
+    written to config.report_dir when set.
+    """
+    config = config or OptimizeConfig()
+    report = RunReport(input_path)
+    with activate(report):
+        result = _optimize(input_path, config, progress, detail, cancelled, analysis, events, report)
+    report.finish()
+    result.report = report.to_dict()
+    if config.report_dir:
+        write_report(report, config)
+    return result
+
+
+def write_report(report, config):
+    """<name>-<path hash>.report.json (and .trace.json) in config.report_dir."""
+    name = os.path.splitext(os.path.basename(report.input_path))[0]
+    tag = hashlib.sha1(os.path.abspath(report.input_path).encode()).hexdigest()[:8]
+    base = os.path.join(config.report_dir, f"{name}-{tag}")
+    try:
+        os.makedirs(config.report_dir, exist_ok=True)
+        report.write_json(base + ".report.json")
+        if config.trace:
+            report.write_chrome_trace(base + ".trace.json")
+    except OSError:
+        pass  # Reports are diagnostics; never fail a run over them
+
+
+def _optimize(input_path, config, progress, detail, cancelled, analysis, events, report):
+    progress = progress or _noop
+    detail = detail or _noop
+    cancelled = cancelled or (lambda: False)
+    result = Result(input_path=input_path)
+    temp_dir = None
+    output_path = None
+
+    try:
+        preset = QUALITY_PRESETS[config.preset]
+        target_size_bytes = config.target_size_bytes
+
+        progress(5, "🚀 V0.64: Starting enhanced optimization...")
+        detail("Initializing V0.64 enhanced pipeline...")
+
+        # Setup
+        temp_dir = tempfile.mkdtemp(prefix="gif_v064_")
+        original_size = os.path.getsize(input_path)
+        original_size_mb = original_size / (1024 * 1024)
+        result.original_size = original_size
+        media = probe(input_path)
+        original_width = media.width
+        original_fps = media.fps
+        output_path = output_path_for(input_path, config.output_dir)
+
+        # ffmpeg's own progress moves the bar through each attempt and goes out as events
+        span = None  # (low, high, status) of the attempt in flight
+
+        def on_event(event):
+            if span and event.fraction is not None:
+                low, high, status = span
+                progress(low + (high - low) * event.fraction, status)
+            if events:
+                events(event)
+
+        tracker = ProgressTracker(on_event, media.duration)
+
+        # Seen this file with these settings before? Replay the winner
+        cache = None
+        if config.cache:
+            cache = ResultCache(config.cache_dir, config.cache_max_mb * 1024 * 1024)
+            digest = file_digest(input_path)
+            settings = settings_key(config, QUALITY_PRESETS)
+            cached = replay_cached(cache, digest, settings, config, input_path, temp_dir, output_path, detail,
+                                   cancelled, tracker)
+            if cached is not None:
+                result.attempts = cached.pop("attempts")
+                size_mb = cached["size"] / (1024 * 1024)
+                compression_pct = ((original_size - cached["size"]) / original_size) * 100
+                progress(100, f"✅ V0.64 Success! {size_mb:.2f} MB ({compression_pct:.1f}% saved) from cache")
+                result.message = f"{size_mb:.2f} MB ({compression_pct:.1f}% saved) from cache"
+                return _finish(result, output_path, cached)
+
+        # Enhanced analysis
+        progress(10, "🧠 V0.64: Enhanced content analysis...")
+        detail("Analyzing motion patterns and scene complexity...")
+        if analysis is None:
+            analysis = enhanced_motion_analysis(input_path, cancelled, media, cache, digest if cache else None)
+
+        # Calculate parameters with analysis
+        size_ratio = original_size / target_size_bytes
+        complexity = analysis.get("complexity_score", 0.5)
+        motion_level = analysis.get("motion_level", "medium")
+
+        # Smart initial parameters
+        if motion_level == "high" and complexity > 0.7:
+            scale_factor = 0.8 if size_ratio > 10 else 0.9
+            fps_factor = 0.9
+            lossy_boost = 8
+        elif motion_level == "low" and complexity < 0.4:
+            scale_factor = min(1.0, preset["scale_factor"] * 1.05)
+            fps_factor = preset["fps_reduction"] * 0.85
+            lossy_boost = -3
+        else:
+            scale_factor = preset["scale_factor"]
+            fps_factor = preset["fps_reduction"]
+            lossy_boost = 0
+
+        # Size-based adjustments
+        if size_ratio > 15:
+            scale_factor *= 0.65
+            lossy_boost += 20
+        elif size_ratio > 8:
+            scale_factor *= 0.8
+            lossy_boost += 12
+        elif size_ratio > 4:
+            scale_factor *= 0.9
+            lossy_boost += 6
+
+        scale = int(original_width * scale_factor) if original_width else 500
+        if scale % 2 == 1:
+            scale -= 1
+        scale = max(140, min(scale, original_width or 1920))
+
+        lossy = max(0, preset["lossy_start"] + lossy_boost)
+
+        # FPS calculation
+        if config.max_fps:
+            max_fps = float(config.max_fps)
+        else:
+            max_fps = original_fps * fps_factor
+        fps_start = max_fps
+
+        # Learned size model: start where it says the target is
+        predictor, features, history = None, None, []
+        if config.learn:
+            predictor = SizePredictor(config.cache_dir)
+            features = file_features(media, original_size, analysis)
+            if original_width and predictor.load():
+                seed = predictor.seed(features, max_fps / original_fps, 256,
+                                      target_size_bytes * FIT_WINDOW, preset["lossy_start"], LOSSY_MAX,
+                                      min_ratio=MIN_SCALE / original_width)
+                if seed:
+                    scale = _even(max(MIN_SCALE, original_width * seed[0]))
+                    lossy = seed[1]
+                    detail(f"Size model ({predictor.samples} samples) suggests Scale {scale}px, Lossy {lossy}")
+
+        progress(15, f"⚙️ V0.64: Smart params (Scale:{scale}, FPS:{max_fps:.1f}, Lossy:{lossy})")
+        detail(f"Motion: {motion_level}, Complexity: {complexity:.1f}, Size ratio: {size_ratio:.1f}x")
+
+        # Bracketed search: lossy is bisected per scale, scale per fps
+        max_attempts = 50 if config.never_give_up else 15
+        attempts = 0
+        level = 0
+        scale_fits, scale_misses = None, None  # scale bracket at the current FPS
+        best = None      # best-quality attempt that fits the target
+        closest = None   # smallest attempt that didn't fit, for the failure message
+        level_fit = None  # lowest-lossy fit at the current level, scored when the level is done
+        explored, explore_ssim = 0, None  # scale steps taken to trade resolution for less lossy
+
+        best_gif, level_gif = None, None  # squeeze_gif outputs of the best fit and the level's fit
+        bases = BaseGifCache(temp_dir)
+        intermediate_nut = os.path.join(temp_dir, "intermediate.nut")
+        intermediate_key, intermediate_ok = None, False
+        fps_steps = 0
+
+        # Long clips: search on a short excerpt, then encode only the winner at full length
+        proxy = plan_proxy(media.duration) if config.proxy else None
+        proxy_nut = os.path.join(temp_dir, "proxy.nut")
+        proxy_key, proxy_ok = None, False
+        proxy_sizes = {}  # Raw excerpt sizes, reused when the byte ratio is recalibrated
+        proxy_best = None  # Best excerpt attempt whose extrapolated size fits
+        verified = set()  # Excerpt picks already encoded at full length
+        if proxy:
+            detail(f"Long clip: searching on a {proxy.seconds:.0f}s excerpt first")
+
+        # Scene-heavy clips: a palette per scene instead of one for everything
+        segments = None
+        if config.palettes == "scenes" or (config.palettes == "auto" and analysis.get("has_scenes")):
+            segments = scene_segments(analysis, media)
+            if segments:
+                detail(f"Palettes: one per scene ({len(segments)} segments)")
+        proxy_segments = excerpt_segments(segments, proxy) if proxy else None
+
+        def sources(prefilter):
+            """(source, chain before scaling) for renders using this prefilter."""
+            nonlocal intermediate_key, intermediate_ok
+            if not config.intermediate:
+                return input_path, prefilter
+            if prefilter != intermediate_key:
+                if intermediate_key is not None and os.path.exists(intermediate_nut):
+                    os.remove(intermediate_nut)
+                intermediate_key = prefilter
+                detail("Decoding source once into a lossless intermediate...")
+                tracker.duration = media.duration
+                intermediate_ok = make_intermediate(input_path, config, prefilter, intermediate_nut, cancelled, tracker)
+            return (intermediate_nut, "") if intermediate_ok else (input_path, prefilter)
+
+        def proxy_source(prefilter):
+            """Cut the excerpt for this prefilter. False when it couldn't be made."""
+            nonlocal proxy_key, proxy_ok
+            if prefilter != proxy_key:
+                proxy_key = prefilter
+                source, chain = sources(prefilter)
+                tracker.duration = proxy.seconds
+                proxy_ok = make_intermediate(source, config, ",".join(filter(None, [chain, proxy.filter])), proxy_nut,
+                                             cancelled, tracker, "excerpt")
+            return proxy_ok
+
+        def attempt_params(size, lossy):
+            return {"size": size, "scale": scale, "fps": max_fps, "lossy": lossy,
+                    "colors": colors, "dither": dither, "bayer_scale": bayer_scale,
+                    "prefilter": prefilter, "motion_level": analysis.get("motion_level"), "segments": segments}
+
+        def settle_level():
+            """Score the level's fit and keep it if it beats the best so far. Returns its SSIM."""
+            nonlocal best, level_fit, best_gif, level_gif
+            if level_fit is None:
+                return None
+            candidate, level_fit = level_fit, None
+            if config.quality:
+                detail(f"Scoring Scale {candidate['scale']}px • Lossy {candidate['lossy']} against the source...")
+                candidate["ssim"], candidate["psnr"] = measure_quality(level_gif, input_path, media,
+                                                                       candidate["scale"], cancelled)
+            if best is None or _quality_rank(candidate) > _quality_rank(best):
+                discard_output(best_gif)
+                best, best_gif = candidate, level_gif
+            else:
+                discard_output(level_gif)
+            level_gif = None
+            return candidate.get("ssim")
+
+        def measure(lossies):
+            """Encode the current level at these lossy values, concurrently when there are several.
+
+            Returns {lossy: size} for the encodes that finished; empty when
+            out of budget, cancelled or failed. Excerpt sizes come back
+            extrapolated to the full clip.
+            """
+            nonlocal attempts, level_fit, level_gif, closest, proxy_best, span
+            on_proxy = source == proxy_nut
+            key = (prefilter, filter_chain, colors, dither, bayer_scale)  # proxy.nut is rebuilt per prefilter
+            todo = [l for l in lossies if not (on_proxy and key + (l,) in proxy_sizes)]
+
+            encoded = {}
+            if todo:
+                if attempts >= max_attempts or cancelled():
+                    return {}
+                todo = todo[:max_attempts - attempts]
+                status = f"🔄 V0.64: Enhanced attempt {attempts + len(todo)}/{max_attempts}"
+                span = (20 + (attempts * 70 / max_attempts), 20 + ((attempts + len(todo)) * 70 / max_attempts), status)
+                report.attempt = attempts + 1
+                progress(span[0], status)
+                tracker.duration = proxy.seconds if on_proxy else media.duration
+                detail(f"{'Excerpt • ' if on_proxy else ''}Scale {scale}px • FPS {max_fps:.1f} • "
+                       f"Lossy {', '.join(map(str, todo))} • Colors {colors}")
+
+                try:
+                    base_gif = prepare_base(source, temp_dir, config, filter_chain, colors, dither, bayer_scale,
+                                            bases, cancelled, tracker, max_fps,
+                                            proxy_segments if on_proxy else segments)
+                    if base_gif is None:
+                        return {}
+                    if len(todo) == 1:
+                        data = squeeze_gif(base_gif, todo[0], analysis, cancelled, temp_dir)
+                        encoded = {todo[0]: (output_size(data), data)} if data else {}
+                    else:
+                        target = target_size_bytes / proxy.ratio if on_proxy else target_size_bytes
+                        encoded = squeeze_speculative(base_gif, todo, analysis, target, cancelled, temp_dir)
+                except subprocess.TimeoutExpired:
+                    detail(f"Timeout on attempt {attempts + 1}, retrying with adjusted params...")
+                    return {}
+                finally:
+                    span = None
+                    # Speculative losers killed mid-encode don't use up the budget; a round
+                    # where nothing finished still counts once so failures can't loop forever
+                    attempts += max(1, len(encoded))
+                    result.attempts = attempts
+                progress(20 + (attempts * 70 / max_attempts), status)
+
+            sizes = {}
+            for lossy, (size, data) in sorted(encoded.items()):
+                report.record_attempt(scale=scale, fps=max_fps, lossy=lossy, colors=colors, dither=dither,
+                                      size=size, excerpt=on_proxy)
+                if on_proxy:
+                    proxy_sizes[key + (lossy,)] = size
+                    discard_output(data)
+                    continue
+                sizes[lossy] = size
+                if original_width:
+                    history.append({"scale_ratio": scale / original_width, "fps_ratio": max_fps / original_fps,
+                                    "lossy": lossy, "colors": colors, "size": size})
+
+                params = attempt_params(size, lossy)
+                if size <= target_size_bytes:
+                    # Same settings, so less lossy is better looking; the level's pick is scored later
+                    if level_fit is None or lossy < level_fit["lossy"]:
+                        discard_output(level_gif)
+                        level_gif, level_fit = data, params
+                        continue
+                elif closest is None or size < closest["size"]:
+                    closest = params
+                discard_output(data)
+
+            if on_proxy:
+                for lossy in lossies:
+                    if key + (lossy,) not in proxy_sizes:
+                        continue
+                    size = int(proxy_sizes[key + (lossy,)] * proxy.ratio)
+                    sizes[lossy] = size
+                    params = attempt_params(size, lossy)
+                    if size <= target_size_bytes and (proxy_best is None
+                                                      or _quality_key(params) > _quality_key(proxy_best)):
+                        proxy_best = params
+            return sizes
+
+        while True:
+            while attempts < max_attempts and not cancelled():
+                # Per-level palette settings stay fixed while lossy is bisected.
+                # Scene thresholds only escalate with FPS steps so the decoded
+                # intermediate survives scale changes.
+                prefilter = build_prefilters(config, max_fps, original_fps, analysis, fps_steps * 5)
+                source, chain = sources(prefilter)
+                if proxy and proxy_source(prefilter):
+                    source, chain = proxy_nut, ""
+                filter_chain = ",".join(filter(None, [chain, build_scale_filter(scale)]))
+                colors = max(64, 256 - (level * 24))
+                if analysis.get("motion_level") == "low":
+                    colors = min(256, colors + 24)  # More colors for low motion
+                elif config.adaptive_bitrate and level > 0:
+                    colors = max(64, colors - 12)  # Adaptive reduction
+
+                # Apply palette with smart dithering
+                dither = preset.get("dither", "sierra2_4a")
+                if max_fps < fps_start:
+                    dither = "bayer"
+                elif analysis.get("motion_level") == "high":
+                    dither = "floyd_steinberg"
+
+                # Adaptive bitrate dithering
+                if config.adaptive_bitrate and complexity > 0.6:
+                    bayer_scale = 3
+                else:
+                    bayer_scale = 5
+
+                fit, sizes = search_lossy(measure, preset["lossy_start"], lossy, LOSSY_MAX, target_size_bytes,
+                                          width=max(1, config.speculative))
+                level_ssim = settle_level()
+                if not sizes:
+                    # Encode failed, out of budget or cancelled
+                    if attempts >= max_attempts or cancelled():
+                        break
+                    level += 1
+                    continue
+
+                if fit is not None:
+                    scale_fits = scale
+                    roomy = sizes[fit] < target_size_bytes * FIT_WINDOW
+                    # Fitting at the quality floor with room to spare: grow the scale, up to the
+                    # last scale that missed or, when none has yet, the source width
+                    ceiling = scale_misses - SCALE_STEP if scale_misses else original_width
+                    if fit <= preset["lossy_start"] and roomy and ceiling and ceiling - scale >= SCALE_STEP:
+                        new_scale = _secant_scale(scale, sizes[fit], target_size_bytes)
+                        scale = _even(min(new_scale, ceiling))
+                        lossy = fit
+                        level += 1
+                        detail(f"Room to spare, growing scale: {scale}px width")
+                        continue
+                    # Lossy is doing heavy lifting: see if a slightly smaller, cleaner encode looks better
+                    if (level_ssim is not None and fit > preset["lossy_start"] and scale > MIN_SCALE
+                            and explored < QUALITY_EXPLORE and (explore_ssim is None or level_ssim > explore_ssim)):
+                        explored, explore_ssim = explored + 1, level_ssim
+                        scale = _even(max(MIN_SCALE, scale * EXPLORE_STEP))
+                        lossy = max(preset["lossy_start"], fit - EXPLORE_LOSSY)
+                        detail(f"SSIM {level_ssim:.4f} at Lossy {fit}, trying {scale}px for less lossy...")
+                        continue
+                    break
+
+                # Nothing fits at this scale even at the highest lossy
+                scale_misses = scale
+                if scale_fits and scale - scale_fits <= SCALE_STEP:
+                    break  # Scale bracket closed, the fitting side is our answer
+                if scale > MIN_SCALE:
+                    # Aim the next scale so the starting lossy lands on target (size ~ scale^2)
+                    reference = sizes.get(lossy) or max(sizes.values())
+                    new_scale = _secant_scale(scale, reference, target_size_bytes)
+                    if scale_fits:
+                        new_scale = max(new_scale, (scale + scale_fits) // 2)
+                    scale = _even(max(MIN_SCALE, min(new_scale, scale - SCALE_STEP)))
+                    level += 1
+                    detail(f"Reducing scale: {scale}px width")
+                elif max_fps > 5:
+                    max_fps = max(5, max_fps * 0.8)
+                    fps_steps += 1
+                    scale = max(MIN_SCALE, int(original_width * 0.6)) if original_width else 350
+                    scale = _even(scale)
+                    scale_fits, scale_misses = None, None
+                    lossy = preset["lossy_start"]
+                    level += 1
+                    detail(f"Never Give Up mode: reducing FPS to {max_fps:.1f}, pushing limits...")
+                else:
+                    break
+
+            if not proxy or attempts >= max_attempts or cancelled():
+                break
+
+            if proxy_best is None:
+                if best is not None or not proxy_ok:
+                    break  # The excerpt couldn't be cut, so the search already ran on the full clip
+                # Nothing fit even on the excerpt - finish the search on the real thing
+                proxy = None
+                scale_fits, scale_misses = None, None
+                continue
+
+            # Encode the excerpt's winner at full length and check the extrapolation
+            candidate, proxy_best = proxy_best, None
+            pick = tuple(candidate[k] for k in ("scale", "fps", "lossy", "colors", "dither", "prefilter"))
+            if pick in verified:
+                break  # Recalibrated search landed on a pick we already encoded in full
+            verified.add(pick)
+            scale, max_fps, lossy = candidate["scale"], candidate["fps"], candidate["lossy"]
+            colors, dither, bayer_scale = candidate["colors"], candidate["dither"], candidate["bayer_scale"]
+            prefilter = candidate["prefilter"]
+            source, chain = sources(prefilter)
+            filter_chain = ",".join(filter(None, [chain, build_scale_filter(scale)]))
+            detail(f"Checking the excerpt's pick on the full clip "
+                   f"(predicted {candidate['size'] / (1024 * 1024):.2f} MB)...")
+            actual = measure([lossy]).get(lossy)
+            settle_level()
+            if actual is None:
+                break
+
+            # Recalibrate the byte ratio from what the full clip really did
+            proxy.ratio *= min(4.0, max(0.25, actual / candidate["size"]))
+            fits = actual <= target_size_bytes
+            if fits and actual >= target_size_bytes * PROXY_ACCEPT:
+                break
+            scale_fits, scale_misses = None, None
+            if len(verified) >= MAX_VERIFY:
+                if best is not None:
+                    break
+                proxy = None  # Extrapolation keeps missing - search the full clip from here
+            detail(f"Excerpt was off by {(actual / candidate['size'] - 1) * 100:+.0f}%, recalibrating...")
+        settle_level()  # The budget can run out mid-level
+        if predictor:
+            predictor.record(digest if cache else os.path.abspath(input_path), features, history)
+
+        if cancelled():
+            result.cancelled = True
+            result.message = "Cancelled"
+            return result
+
+        if best is not None:
+            size_mb = best["size"] / (1024 * 1024)
+            compression_pct = ((original_size - best["size"]) / original_size) * 100
+            write_atomic(output_path, best_gif)
+            progress(100, f"✅ V0.64 Success! {size_mb:.2f} MB ({compression_pct:.1f}% saved)")
+            quality = f", SSIM {best['ssim']:.4f}" if best.get("ssim") is not None else ""
+            detail(f"Target achieved in {attempts} attempts using smart optimization{quality}")
+            result.message = f"{size_mb:.2f} MB ({compression_pct:.1f}% saved) in {attempts} attempts{quality}"
+            if cache:
+                cache.store(digest, settings, config.target_mb, best,
+                            output_path if config.cache_outputs else None)
+            return _finish(result, output_path, best)
+
+        # Anything over target fails the Steam upload, so there is no "close enough"
+        progress(0, f"❌ Could not compress {original_size_mb:.1f}MB to under {target_size_bytes/(1024*1024):.1f}MB")
+        if closest is not None:
+            detail(f"Closest attempt was {closest['size'] / (1024 * 1024):.2f} MB - try Maximum Compression preset")
+        else:
+            detail("All optimization attempts exhausted - try Maximum Compression preset")
+        result.message = f"Could not compress {original_size_mb:.1f}MB to under {target_size_bytes/(1024*1024):.1f}MB"
+        return result
+
+    except Cancelled:
+        result.cancelled = True
+        result.message = "Cancelled"
+        return result
+    except Exception as e:
+        progress(0, f"❌ V0.64 Error: {str(e)}")
+        detail(f"Critical error: {str(e)[:60]}")
+        result.message = f"Error: {e}"
+        return result
+    finally:
+        if output_path:
+            # Don't leave a half-finished or oversized attempt behind
+            if not result.success and os.path.exists(output_path):
+                try:
+                    os.remove(output_path)
+                except OSError:
+                    pass
+            release_output_path(output_path)
+        if temp_dir and os.path.exists(temp_dir):
+            try:
+                shutil.rmtree(temp_dir)
+            except:
+                pass
+
+
+def _finish(result, output_path, params):
+    """Record the winning attempt on the result."""
+    result.output_path = output_path
+    result.final_size = params["size"]
+    result.scale = params["scale"]
+    result.fps = params["fps"]
+    result.lossy = int(params["lossy"])
+    result.colors = params["colors"]
+    result.dither = params["dither"]
+    result.ssim = params.get("ssim")
+    result.psnr = params.get("psnr")
+    return result
@@ -0,0 +1,162 @@
+import mmap
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+class GifFormatError(ValueError):
+    pass
+
+
+@dataclass
+class GifFrame:
+    """One image descriptor plus its Graphic Control Extension."""
+    left: int
+    top: int
+    width: int
+    height: int
+    delay_cs: int = 0  # As stored, in 1/100 s
+    disposal: int = 0
+    transparent_index: Optional[int] = None
+    local_colors: int = 0  # Local color table entries, 0 = uses the global table
+    interlaced: bool = False
+    lzw_bytes: int = 0  # Compressed image data size
+
+    @property
+    def delay(self):
+        """Delay in seconds as browsers (and Steam) play it - 0/1 cs is bumped to 10 cs."""
+        return (self.delay_cs if self.delay_cs >= 2 else 10) / 100
+
+
+@dataclass
+class GifInfo:
+    """Structure of a GIF file, read without decoding any pixels."""
+    width: int
+    height: int
+    global_colors: int = 0
+    background_index: int = 0
+    loop_count: Optional[int] = None  # 0 = forever, None = no NETSCAPE block
+    frames: List[GifFrame] = field(default_factory=list)
+
+    @property
+    def frame_count(self):
+        return len(self.frames)
+
+    @property
+    def delays(self):
+        return [frame.delay for frame in self.frames]
+
+    @property
+    def duration(self):
+        return sum(self.delays)
+
+    @property
+    def frame_bytes(self):
+        return [frame.lzw_bytes for frame in self.frames]
+
+
+def parse_gif(path):
+    """Walk the GIF block structure of path with a memory-mapped reader."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < 13:
+            raise GifFormatError("File too small to be a GIF")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parse_gif_bytes(data)
+
+
+def parse_gif_bytes(data):
+    """Parse a GIF from any bytes-like object (bytes, mmap, memoryview)."""
+    if data[:6] not in (b"GIF87a", b"GIF89a"):
+        raise GifFormatError("Not a GIF file")
+
+    width, height, packed, background = struct.unpack_from("<HHBB", data, 6)
+    info = GifInfo(width=width, height=height, background_index=background)
+    pos = 13
+    if packed & 0x80:
+        info.global_colors = 2 << (packed & 0x07)
+        pos += 3 * info.global_colors
+
+    size = len(data)
+    try:
+        _walk_blocks(data, pos, size, info)
+    except (IndexError, struct.error):
+        # Truncated file: keep the frames that were complete
+        if not info.frames:
+            raise GifFormatError("Truncated GIF")
+
+    if not info.frames:
+        raise GifFormatError("GIF has no frames")
+    return info
+
+
+def _walk_blocks(data, pos, size, info):
+    pending_gce = None
+
+    while pos < size:
+        block = data[pos]
+
+        if block == 0x21:  # Extension
+            label = data[pos + 1]
+            pos += 2
+            if label == 0xF9 and data[pos] >= 4:
+                gce_packed, delay, transparent = struct.unpack_from("<BHB", data, pos + 1)
+                pending_gce = (delay, (gce_packed >> 2) & 0x07,
+                               transparent if gce_packed & 0x01 else None)
+            elif label == 0xFF and data[pos] == 11 and data[pos + 1:pos + 12] in (b"NETSCAPE2.0", b"ANIMEXTS1.0"):
+                sub = pos + 12
+                if data[sub] >= 3 and data[sub + 1] == 1:
+                    info.loop_count = struct.unpack_from("<H", data, sub + 2)[0]
+            pos, _ = _skip_sub_blocks(data, pos, size)
+
+        elif block == 0x2C:  # Image descriptor
+            left, top, frame_w, frame_h, frame_packed = struct.unpack_from("<HHHHB", data, pos + 1)
+            frame = GifFrame(left=left, top=top, width=frame_w, height=frame_h,
+                             interlaced=bool(frame_packed & 0x40))
+            if pending_gce:
+                frame.delay_cs, frame.disposal, frame.transparent_index = pending_gce
+                pending_gce = None
+            pos += 10
+            if frame_packed & 0x80:
+                frame.local_colors = 2 << (frame_packed & 0x07)
+                pos += 3 * frame.local_colors
+            pos += 1  # LZW minimum code size
+
+            pos, frame.lzw_bytes = _skip_sub_blocks(data, pos, size)
+            info.frames.append(frame)
+
+        elif block == 0x3B:  # Trailer
+            break
+
+        else:
+            # Garbage after the last frame is common; keep what we have
+            if info.frames:
+                break
+            raise GifFormatError(f"Unexpected block 0x{block:02x} at offset {pos}")
+
+
+def _skip_sub_blocks(data, pos, size):
+    """Skip a sub-block chain. Returns (offset past the terminator, payload bytes)."""
+    payload = 0
+    while pos < size:
+        length = data[pos]
+        pos += length + 1
+        if length == 0:
+            break
+        payload += length
+    if pos > size:
+        payload -= pos - size  # Truncated mid-block
+    return min(pos, size), payload
+
+
+def byte_complexity(width, height, frame_bytes):
+    """0..1 complexity from how hard the frames were to compress.
+
+    LZW bytes per canvas pixel track visual detail and motion far better
+    than a scene-change count: static or flat content codes to a fraction
+    of a byte per pixel, noisy full-frame motion approaches a whole byte.
+    """
+    if not frame_bytes or not width or not height:
+        return 0.5
+    per_pixel = sum(frame_bytes) / (len(frame_bytes) * width * height)
+    return max(0.0, min(1.0, per_pixel / 0.6))
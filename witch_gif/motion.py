@@ -0,0 +1,174 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # Optional: without it the optimizer falls back to ffmpeg scene detection
+    np = None
+
+from .tools import FFMPEG, Cancelled, run
+
+ANALYSIS_VERSION = 1
+ANALYSIS_WIDTH = 96  # Frames are analyzed at this width; plenty for motion and colour statistics
+CHUNK_FRAMES = 64  # Frames per vectorized batch, keeps memory flat on long clips
+PIXEL_TOLERANCE = 8  # Luma change (0..255) below which a pixel counts as unchanged
+STATIC_SHARE = 0.05  # A pixel that changes in fewer frames than this is part of the static mask
+SCENE_ENERGY = 0.15  # Mean luma change that marks a hard cut
+
+
+class MotionStats:
+    """Accumulates motion and colour statistics over rgb24 frames fed in any chunking.
+
+    Per frame: difference energy (mean absolute luma change from the
+    previous frame, 0..1) and whether it duplicates it. Over the clip: how
+    often each pixel changes (for the static mask) and a 12-bit colour
+    histogram (for entropy).
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.frame_size = width * height * 3
+        self.pending = bytearray()
+        self.previous = None  # Luma of the last frame seen
+        self.energy = []
+        self.duplicates = []
+        self.changes = np.zeros((height, width), dtype=np.int64)
+        self.histogram = np.zeros(4096, dtype=np.int64)
+
+    def feed(self, data):
+        self.pending += data
+        batch = len(self.pending) // self.frame_size
+        if batch >= CHUNK_FRAMES:
+            self._consume(batch)
+
+    def close(self):
+        batch = len(self.pending) // self.frame_size
+        if batch:
+            self._consume(batch)
+
+    def _consume(self, count):
+        size = count * self.frame_size
+        frames = np.frombuffer(bytes(self.pending[:size]), dtype=np.uint8).reshape(count, self.height, self.width, 3)
+        del self.pending[:size]
+
+        rgb = frames.astype(np.int32)
+        luma = (rgb[..., 0] * 77 + rgb[..., 1] * 150 + rgb[..., 2] * 29) >> 8
+        self.histogram += np.bincount(((rgb[..., 0] >> 4) << 8 | (rgb[..., 1] >> 4) << 4 | rgb[..., 2] >> 4).ravel(),
+                                      minlength=4096)
+
+        if self.previous is None:
+            # The first frame has nothing to differ from
+            self.energy.append(0.0)
+            self.duplicates.append(False)
+            self.previous = luma[0]
+            luma = luma[1:]
+            if not len(luma):
+                return
+        diff = np.abs(np.diff(np.concatenate([self.previous[None], luma]), axis=0))
+        changed = diff > PIXEL_TOLERANCE
+        self.energy.extend((diff.mean(axis=(1, 2)) / 255).tolist())
+        self.duplicates.extend((~changed.any(axis=(1, 2))).tolist())
+        self.changes += changed.sum(axis=0)
+        self.previous = luma[-1]
+
+    def summary(self):
+        frames = len(self.energy)
+        energy = np.asarray(self.energy)
+        moving = energy[~np.asarray(self.duplicates)] if frames else energy
+        motion = float(moving[1:].mean()) if len(moving) > 1 else 0.0
+
+        counts = self.histogram[self.histogram > 0] / max(1, self.histogram.sum())
+        entropy = float(-(counts * np.log2(counts)).sum())  # 0..12 bits
+
+        static = self.changes < max(1, STATIC_SHARE * frames)
+        cuts = [i for i, e in enumerate(self.energy) if e > SCENE_ENERGY]
+
+        if motion > 0.06:
+            motion_level = "high"
+        elif motion > 0.02:
+            motion_level = "medium"
+        else:
+            motion_level = "low"
+        complexity = min(1.0, 0.1 + 0.5 * entropy / 12 + 0.4 * min(1.0, motion / 0.1))
+
+        return {
+            "motion_level": motion_level,
+            "has_scenes": len(cuts) > max(2, frames // 100),
+            "complexity_score": round(complexity, 3),
+            "source": "frames",
+            "version": ANALYSIS_VERSION,
+            "frames": frames,
+            "motion": round(motion, 5),
+            "energy": [round(e, 5) for e in self.energy],
+            "duplicate_runs": _runs(self.duplicates),
+            "duplicate_fraction": round(sum(self.duplicates) / max(1, frames), 4),
+            "static_fraction": round(float(static.mean()), 4),
+            "static_mask": ["".join("1" if v else "0" for v in row) for row in static.tolist()],
+            "colour_entropy": round(entropy, 3),
+            "scene_cuts": cuts,
+        }
+
+
+def _runs(flags):
+    """[start, length] of every run of duplicate frames (start = first duplicate)."""
+    runs = []
+    for i, flag in enumerate(flags):
+        if not flag:
+            continue
+        if runs and runs[-1][0] + runs[-1][1] == i:
+            runs[-1][1] += 1
+        else:
+            runs.append([i, 1])
+    return runs
+
+
+MEMO_SIZE = 32  # Recent analyses kept in memory; a file is re-read within moments of its analysis
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def analyze_frames(path, media, cancelled=None):
+    """Motion/colour statistics over every frame of path, or None without NumPy (or on failure).
+
+    Frames are decoded once, downscaled, and streamed from ffmpeg as raw RGB
+    into MotionStats in fixed-size batches. Results are memoized on
+    (path, size, mtime) so the GUI's analysis and the optimizer share one pass;
+    only the MEMO_SIZE most recent are kept.
+    """
+    if np is None or not media.width or not media.height:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+
+    width = min(ANALYSIS_WIDTH, media.width)
+    height = max(2, int(round(width * media.height / media.width / 2)) * 2)
+    stats = MotionStats(width, height)
+    cmd = [FFMPEG, "-v", "error", "-i", path, "-vf", f"scale={width}:{height}:flags=area,format=rgb24",
+           "-vsync", "passthrough", "-f", "rawvideo", "pipe:1"]
+    try:
+        result = run(cmd, timeout=max(60, math.ceil(media.duration * 2)), cancelled=cancelled,
+                     on_stdout=stats.feed, chunks=True, stage="analysis", reads=[path])
+    except Cancelled:
+        raise
+    except Exception:
+        return None
+    stats.close()
+    if result.returncode or not stats.energy:
+        return None
+
+    analysis = stats.summary()
+    with _memo_lock:
+        _memo[key] = analysis
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return analysis
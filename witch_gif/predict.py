@@ -0,0 +1,221 @@
+import json
+import math
+import os
+import threading
+
+from .cache import default_cache_dir
+
+MAX_SAMPLES = 5000  # Oldest samples are dropped past this
+MIN_SAMPLES = 20
+MIN_FILES = 3
+RIDGE = 1e-2  # Per sample, on standardized features
+# Mean frame difference energy when the frame analysis isn't available, by ffmpeg's motion bucket
+MOTION_BY_LEVEL = {"low": 0.01, "medium": 0.04, "high": 0.08}
+
+
+def file_features(media, original_size, analysis=None):
+    """Content features of a source GIF (independent of encode parameters).
+
+    motion is the mean frame difference energy from the motion analysis,
+    which says more about how well frames delta-compress than anything
+    the probe sees.
+    """
+    pixels = max(1, (media.width or 1) * (media.height or 1))
+    frames = max(1, media.frame_count)
+    if media.frame_bytes:
+        bpp = [b / pixels for b in media.frame_bytes]
+    else:
+        bpp = [original_size / (frames * pixels)]
+    mean = sum(bpp) / len(bpp)
+    std = (sum((b - mean) ** 2 for b in bpp) / len(bpp)) ** 0.5
+    return {
+        "log_size": math.log(max(1, original_size)),
+        "log_frames": math.log(frames),
+        "log_pixels": math.log(pixels),
+        "bpp_mean": mean,
+        "bpp_std": std,
+        "complexity": media.complexity if media.complexity is not None else 0.5,
+        "motion": _motion(analysis or {}),
+    }
+
+
+def _motion(analysis):
+    energy = analysis.get("energy")
+    if energy:
+        return sum(energy) / len(energy)
+    return MOTION_BY_LEVEL.get(analysis.get("motion_level"), MOTION_BY_LEVEL["medium"])
+
+
+def _vector(features, scale_ratio, fps_ratio, lossy, colors):
+    """Regression inputs. Output bytes scale ~ original * scale^2 * fps, so those go in as logs."""
+    return [
+        1.0,
+        features["log_size"],
+        features["log_frames"],
+        features["log_pixels"],
+        features["bpp_mean"],
+        features["bpp_std"],
+        features["complexity"],
+        features.get("motion", MOTION_BY_LEVEL["medium"]),  # Samples recorded before it was a feature
+        2 * math.log(max(0.01, scale_ratio)),
+        math.log(max(0.01, fps_ratio)),
+        lossy / 100,
+        (lossy / 100) ** 2,
+        math.log(max(2, colors) / 256),
+    ]
+
+
+def _standardize(x, means, scales):
+    return [(v - m) / s for v, m, s in zip(x, means, scales)]
+
+
+def _solve(matrix, vector):
+    """Gaussian elimination with partial pivoting (tiny systems, no NumPy needed)."""
+    n = len(vector)
+    rows = [row[:] + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, n):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, n + 1):
+                rows[r][c] -= factor * rows[col][c]
+    weights = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        weights[r] = (rows[r][n] - sum(rows[r][c] * weights[c] for c in range(r + 1, n))) / rows[r][r]
+    return weights
+
+
+class SizePredictor:
+    """Learns output size from every encode we have ever measured.
+
+    Each attempt is stored as (file features, scale, fps, lossy, colors ->
+    bytes) in a JSONL file next to the result cache, and a ridge regression
+    on log(bytes) is fitted from it. The optimizer uses the inverse to seed
+    its first attempt; the GUI uses the forward model for its prediction.
+    """
+
+    _lock = threading.Lock()
+    _fits = {}  # path -> ((mtime, size) of the sample file, fitted model), shared by every instance
+
+    def __init__(self, root=None):
+        self.path = os.path.join(root or default_cache_dir(), "size_samples.jsonl")
+        self.weights = None
+        self.samples = 0
+
+    def load(self):
+        """Fit from the stored samples. Returns True when the model is usable.
+
+        The fit is cached per sample file and only redone when the file
+        changed, so loading on every run and every GUI file drop is cheap.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._fits.get(self.path)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, self._fit())
+            with self._lock:
+                self._fits[self.path] = cached
+        fit = cached[1]
+        if fit is None:
+            return False
+        self.means, self.scales, self.weights, self.samples = fit
+        return True
+
+    def _fit(self):
+        """(means, scales, weights, samples) fitted from the sample file, None when there's too little."""
+        rows = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            return None
+
+        rows = rows[-MAX_SAMPLES:]
+        if len(rows) < MIN_SAMPLES or len({r.get("file") for r in rows}) < MIN_FILES:
+            return None
+
+        xs = [_vector(r["features"], r["scale_ratio"], r["fps_ratio"], r["lossy"], r["colors"]) for r in rows]
+        ys = [math.log(max(1, r["size"])) for r in rows]
+
+        # Standardize so the ridge penalty treats every feature alike (with
+        # only a handful of files the per-file features are nearly collinear)
+        n = len(xs[0])
+        count = len(xs)
+        means = [sum(x[i] for x in xs) / count for i in range(n)]
+        scales = [1.0] * n
+        for i in range(1, n):
+            var = sum((x[i] - means[i]) ** 2 for x in xs) / count
+            scales[i] = var ** 0.5 or 1.0
+        means[0] = 0.0
+        zs = [_standardize(x, means, scales) for x in xs]
+
+        ridge = RIDGE * count
+        xtx = [[sum(z[i] * z[j] for z in zs) + (ridge if i == j and i else 0) for j in range(n)] for i in range(n)]
+        xty = [sum(z[i] * y for z, y in zip(zs, ys)) for i in range(n)]
+        weights = _solve(xtx, xty)
+        return (means, scales, weights, count) if weights is not None else None
+
+    @property
+    def ready(self):
+        return self.weights is not None
+
+    def predict(self, features, scale_ratio, fps_ratio, lossy, colors):
+        """Predicted output bytes, or None while untrained."""
+        if not self.ready:
+            return None
+        x = _standardize(_vector(features, scale_ratio, fps_ratio, lossy, colors), self.means, self.scales)
+        return math.exp(sum(w * v for w, v in zip(self.weights, x)))
+
+    def seed(self, features, fps_ratio, colors, target, lossy_floor, lossy_max, min_ratio=0.1, comfort_lossy=110):
+        """Invert the model: the largest scale that fits at a comfortable lossy.
+
+        Returns (scale_ratio, lossy) or None while untrained.
+        """
+        if not self.ready:
+            return None
+
+        ratio = 1.0
+        fallback = None
+        while ratio >= min_ratio:
+            for lossy in range(int(lossy_floor), int(lossy_max) + 1, 2):
+                if self.predict(features, ratio, fps_ratio, lossy, colors) <= target:
+                    if lossy <= comfort_lossy:
+                        return ratio, lossy
+                    fallback = fallback or (ratio, lossy)
+                    break
+            ratio -= 0.05
+        return fallback
+
+    def record(self, file_id, features, attempts):
+        """Append measured attempts: dicts with scale_ratio, fps_ratio, lossy, colors, size."""
+        if not attempts:
+            return
+        lines = [json.dumps(dict(a, file=file_id, features=features)) for a in attempts]
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+                self._trim()
+            except OSError:
+                pass
+
+    def _trim(self):
+        """Keep the sample file bounded."""
+        if os.path.getsize(self.path) < 4 * 1024 * 1024:
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.readlines()[-MAX_SAMPLES:]
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import List, Optional
+
+from .gifparse import GifFormatError, byte_complexity, parse_gif
+from .tools import FFMPEG, FFPROBE, run
+
+DEFAULT_FPS = 25.0
+
+
+@dataclass
+class MediaInfo:
+    """Everything we need to know about a source GIF, from one probe."""
+    width: Optional[int] = None
+    height: Optional[int] = None
+    frame_count: int = 0
+    delays: List[float] = field(default_factory=list)  # Seconds per frame
+    duration: float = 0.0  # Seconds
+    loop_count: Optional[int] = None  # 0 = forever, None = plays once (no NETSCAPE block)
+    frame_bytes: List[int] = field(default_factory=list)  # Compressed size per frame, native parser only
+
+    @property
+    def complexity(self):
+        """Byte-based complexity (0..1), None when per-frame sizes aren't known."""
+        if not self.frame_bytes:
+            return None
+        return byte_complexity(self.width, self.height, self.frame_bytes)
+
+    @property
+    def fps(self):
+        """Average frame rate, clamped to the range the optimizer works with."""
+        if self.frame_count and self.duration > 0:
+            fps = self.frame_count / self.duration
+            if 5 <= fps <= 120:
+                return fps
+        return DEFAULT_FPS
+
+    @property
+    def variable_delays(self):
+        return len(set(round(d, 2) for d in self.delays)) > 1
+
+    @property
+    def duration_text(self):
+        """Duration as HH:MM:SS.xx, like FFmpeg prints it."""
+        if self.duration <= 0:
+            return "Unknown"
+        hours, rest = divmod(self.duration, 3600)
+        minutes, seconds = divmod(rest, 60)
+        return f"{int(hours):02d}:{int(minutes):02d}:{seconds:05.2f}"
+
+
+def read_loop_count(path):
+    """Loop count from the NETSCAPE2.0 extension, which sits right after the global color table."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(1024)
+        index = head.find(b"NETSCAPE2.0")
+        if index >= 0 and head[index + 11:index + 13] == b"\x03\x01":
+            return struct.unpack("<H", head[index + 13:index + 15])[0]
+    except OSError:
+        pass
+    return None
+
+
+def _probe_native(path):
+    """Read everything straight from the GIF blocks - no process spawn, no decoding."""
+    gif = parse_gif(path)
+    return MediaInfo(width=gif.width, height=gif.height, frame_count=gif.frame_count,
+                     delays=gif.delays, duration=gif.duration, loop_count=gif.loop_count,
+                     frame_bytes=gif.frame_bytes)
+
+
+def _probe_ffprobe(path):
+    """One ffprobe call: stream geometry plus per-packet timing (no decoding)."""
+    cmd = [FFPROBE, "-v", "error", "-print_format", "json", "-select_streams", "v:0",
+           "-show_entries", "stream=width,height,time_base:format=duration:packet=pts,duration",
+           path]
+    result = run(cmd, timeout=15, stage="probe", reads=[path], text=True, errors="ignore")
+    data = json.loads(result.stdout or "{}")
+    streams = data.get("streams") or []
+    if not streams:
+        return None
+
+    stream = streams[0]
+    time_base = Fraction(stream.get("time_base", "1/100"))
+    packets = data.get("packets") or []
+    delays = [float(int(p.get("duration", 0)) * time_base) for p in packets]
+
+    duration = sum(delays)
+    if not duration:
+        try:
+            duration = float(data.get("format", {}).get("duration", 0))
+        except ValueError:
+            duration = 0.0
+
+    return MediaInfo(width=stream.get("width"), height=stream.get("height"),
+                     frame_count=len(packets), delays=delays, duration=duration)
+
+
+def _probe_ffmpeg(path):
+    """Fallback for installs without ffprobe: scrape a single 'ffmpeg -i' run."""
+    result = run([FFMPEG, "-i", path], timeout=10, stage="probe", reads=[path], text=True, errors="ignore")
+    info = MediaInfo()
+    fps = None
+
+    for line in result.stderr.splitlines():
+        if "Duration:" in line:
+            match = re.search(r"Duration:\s*(\d+):(\d+):([\d.]+)", line)
+            if match:
+                info.duration = int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3))
+
+        if "Video:" in line:
+            match = re.search(r'(\d{2,})x(\d{2,})', line)
+            if match and info.width is None:
+                info.width, info.height = int(match.group(1)), int(match.group(2))
+            for unit in ("fps", "tbr"):
+                match = re.search(r"([\d.]+)\s*" + unit, line)
+                if match and fps is None and 5 <= float(match.group(1)) <= 120:
+                    fps = float(match.group(1))
+
+    fps = fps or DEFAULT_FPS
+    if info.duration:
+        info.frame_count = max(1, round(info.duration * fps))
+        info.delays = [1 / fps] * info.frame_count
+    return info
+
+
+CACHE_SIZE = 32  # Recent probes kept in memory; a file is re-probed within moments of the first
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def probe(path):
+    """Width, height, frame count, per-frame delays, duration and loop count in one go.
+
+    GIFs are read natively from their block structure; anything the parser
+    rejects goes through ffprobe (or ffmpeg when ffprobe isn't bundled).
+
+    Results are memoized on (path, size, mtime) so the GUI's file analysis
+    and the optimizer share a single probe; only the CACHE_SIZE most recent
+    are kept.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return MediaInfo()
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    info = None
+    try:
+        info = _probe_native(path)
+    except (GifFormatError, OSError, ValueError):
+        pass
+    if info is None:
+        # Not a GIF (or a damaged one) - let FFmpeg have a go
+        try:
+            info = _probe_ffprobe(path)
+        except Exception:
+            pass
+        if info is None:
+            try:
+                info = _probe_ffmpeg(path)
+            except Exception:
+                info = MediaInfo()
+        info.loop_count = read_loop_count(path)
+
+    with _cache_lock:
+        _cache[key] = info
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return info
@@ -0,0 +1,90 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# Machine-readable progress on stdout, no human stats on stderr
+PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats"]
+
+
+@dataclass
+class ProgressEvent:
+    """One throughput sample from a running ffmpeg."""
+    stage: str  # "intermediate", "excerpt", "render", "palette" or "paletteuse"
+    frame: int = 0  # Frames written so far
+    out_time: float = 0.0  # Seconds of output written so far
+    duration: Optional[float] = None  # Seconds the stage will write in total, when known
+    elapsed: float = 0.0  # Wall seconds since the stage started
+    done: bool = False
+
+    @property
+    def fraction(self):
+        """0..1 through the stage, None when the duration isn't known."""
+        if not self.duration:
+            return None
+        return max(0.0, min(1.0, self.out_time / self.duration))
+
+    @property
+    def fps(self):
+        """Frames processed per wall second."""
+        return self.frame / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def speed(self):
+        """Seconds of footage processed per wall second."""
+        return self.out_time / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """Seconds left in the stage, None until there's something to go on."""
+        if self.done:
+            return 0.0
+        fraction = self.fraction
+        if not fraction:
+            return None
+        return self.elapsed * (1 - fraction) / fraction
+
+    @property
+    def summary(self):
+        text = f"{self.stage}: frame {self.frame} • {self.fps:.1f} fps • {self.elapsed:.0f}s"
+        eta = self.eta
+        if eta is not None and not self.done:
+            text += f" • ETA {eta:.0f}s"
+        return text
+
+
+class ProgressTracker:
+    """Turns ffmpeg's -progress key=value blocks into ProgressEvents.
+
+    watch(stage) returns the line callback for one ffmpeg run; emit(event)
+    gets an event every time ffmpeg finishes a block (about twice a second).
+    """
+
+    def __init__(self, emit, duration=None):
+        self.emit = emit
+        self.duration = duration
+
+    def watch(self, stage, duration=None):
+        start = time.monotonic()
+        duration = duration or self.duration
+        block = {}
+
+        def on_line(line):
+            key, sep, value = line.strip().partition("=")
+            if not sep:
+                return
+            block[key] = value
+            if key != "progress":
+                return
+            self.emit(ProgressEvent(stage=stage, frame=_int(block.get("frame")),
+                                    out_time=_int(block.get("out_time_us")) / 1e6,
+                                    duration=duration, elapsed=time.monotonic() - start,
+                                    done=value == "end"))
+
+        return on_line
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0  # "N/A" before the first frame
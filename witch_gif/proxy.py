@@ -0,0 +1,34 @@
+import math
+from dataclasses import dataclass
+
+PROXY_MIN_SECONDS = 30  # Shorter clips are searched at full length
+PROXY_SECONDS = 10  # Footage kept in the excerpt
+PROXY_SEGMENT = 2.0  # Contiguous run per sample, so frame-to-frame deltas stay realistic
+MAX_VERIFY = 2  # Full-length encodes before giving up on the excerpt
+PROXY_ACCEPT = 0.9  # A full-length fit this close to target is taken as is
+
+
+@dataclass
+class ProxyPlan:
+    """A temporally subsampled excerpt: the first segment seconds of every period."""
+    period: float
+    segment: float
+    seconds: float  # Footage actually kept
+    ratio: float  # Full duration / excerpt duration, the first guess at the byte ratio
+
+    @property
+    def filter(self):
+        """Keep the sampled runs and close the gaps so frame delays are untouched."""
+        gap = self.period - self.segment
+        return (f"select='lt(mod(t,{self.period:.3f}),{self.segment:.3f})',"
+                f"setpts='PTS-floor(T/{self.period:.3f})*{gap:.3f}/TB'")
+
+
+def plan_proxy(duration):
+    """Excerpt plan for a clip of this many seconds, None when it's short enough to search directly."""
+    if not duration or duration < PROXY_MIN_SECONDS:
+        return None
+    period = duration * PROXY_SEGMENT / PROXY_SECONDS
+    runs = math.ceil(duration / period)
+    kept = sum(min(PROXY_SEGMENT, duration - i * period) for i in range(runs))
+    return ProxyPlan(period=period, segment=PROXY_SEGMENT, seconds=kept, ratio=duration / kept)
@@ -0,0 +1,34 @@
+import re
+
+from .tools import FFMPEG, run
+
+_SSIM = re.compile(r"SSIM .*All:([\d.]+)")
+_PSNR = re.compile(r"PSNR .*average:([\d.]+|inf)")
+
+
+def compare(distorted, reference, fps, width=None, timeout=120, cancelled=None, every=1):
+    """SSIM and PSNR of distorted against reference, as (ssim, psnr).
+
+    Both clips are resampled to the same frame rate (so dropped or merged
+    frames are compared against what was on screen at that moment) and the
+    reference is scaled to the distorted width. every=N compares only every
+    Nth of those frames. distorted may be a path or GIF bytes, which are
+    piped in. Either value is None when FFmpeg couldn't compute it.
+    """
+    scale = f",scale={width}:-2:flags=bicubic" if width else ""
+    sample = f",select='not(mod(n,{every}))'" if every > 1 else ""
+    graph = (f"[0:v]fps={fps:.3f}{sample},format=rgb24,split[d1][d2];"
+             f"[1:v]fps={fps:.3f}{sample}{scale},format=rgb24,split[r1][r2];"
+             f"[d1][r1]ssim;[d2][r2]psnr")
+    in_memory = isinstance(distorted, (bytes, bytearray))
+    source = ["-f", "gif", "-i", "pipe:0"] if in_memory else ["-i", distorted]
+    cmd = [FFMPEG, "-hide_banner", "-nostats", *source, "-i", reference,
+           "-filter_complex", graph, "-f", "null", "-"]
+    result = run(cmd, timeout=timeout, cancelled=cancelled, stage="quality",
+                 reads=[reference] if in_memory else [distorted, reference], stdin=[distorted] if in_memory else None)
+    stderr = result.stderr.decode("utf-8", "ignore")
+
+    ssim = _SSIM.search(stderr)
+    psnr = _PSNR.search(stderr)
+    return (float(ssim.group(1)) if ssim else None,
+            float(psnr.group(1)) if psnr else None)
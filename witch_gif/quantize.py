@@ -0,0 +1,236 @@
+import re
+
+try:
+    import numpy as np
+except ImportError:  # Optional: without it every palette goes through ffmpeg palettegen/paletteuse
+    np = None
+
+HIST_BITS = 5  # Histogram bins per channel = 2**HIST_BITS
+LUT_BITS = 6  # Nearest-colour lookup table resolution per channel
+KMEANS_ROUNDS = 4
+
+# Error diffusion kernels as (dy, dx, weight) with the divisor, same names as ffmpeg's paletteuse
+KERNELS = {
+    "floyd_steinberg": ([(0, 1, 7), (1, -1, 3), (1, 0, 5), (1, 1, 1)], 16),
+    "sierra2_4a": ([(0, 1, 2), (1, -1, 1), (1, 0, 1)], 4),
+    "sierra2": ([(0, 1, 4), (0, 2, 3), (1, -2, 1), (1, -1, 2), (1, 0, 3), (1, 1, 2), (1, 2, 1)], 16),
+    "sierra3": ([(0, 1, 5), (0, 2, 3), (1, -2, 2), (1, -1, 4), (1, 0, 5), (1, 1, 4), (1, 2, 2),
+                 (2, -1, 2), (2, 0, 3), (2, 1, 2)], 32),
+    "burkes": ([(0, 1, 8), (0, 2, 4), (1, -2, 2), (1, -1, 4), (1, 0, 8), (1, 1, 4), (1, 2, 2)], 32),
+    "atkinson": ([(0, 1, 1), (0, 2, 1), (1, -1, 1), (1, 0, 1), (1, 1, 1), (2, 0, 1)], 8),
+    "heckbert": ([(0, 1, 3), (1, 0, 3), (1, 1, 2)], 8),
+}
+DITHERS = set(KERNELS) | {"bayer", "none"}
+
+# 8x8 Bayer matrix, 0..63
+_BAYER = None
+
+
+def available():
+    return np is not None
+
+
+class Histogram:
+    """Colour histogram over sampled frames, HIST_BITS per channel.
+
+    Built once per source and filter chain; palettes for any number of
+    colour counts are then cut from it without decoding anything again.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(1 << (3 * HIST_BITS), dtype=np.int64)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def add(self, frame):
+        """Count the pixels of one (h, w, 3) uint8 frame, every other pixel each way."""
+        shift = 8 - HIST_BITS
+        pixels = frame[::2, ::2].reshape(-1, 3).astype(np.int32) >> shift
+        index = (pixels[:, 0] << (2 * HIST_BITS)) | (pixels[:, 1] << HIST_BITS) | pixels[:, 2]
+        self.counts += np.bincount(index, minlength=len(self.counts))
+
+    def points(self):
+        """(bin centre colours as float (n, 3), weights) for every non-empty bin."""
+        index = np.nonzero(self.counts)[0]
+        mask = (1 << HIST_BITS) - 1
+        bins = np.stack([index >> (2 * HIST_BITS), (index >> HIST_BITS) & mask, index & mask], axis=1)
+        step = 1 << (8 - HIST_BITS)
+        return (bins * step + step / 2).astype(np.float64), self.counts[index].astype(np.float64)
+
+
+def median_cut(histogram, colors):
+    """Palette of up to colors entries (uint8 (k, 3)): median cut, then a few weighted k-means rounds."""
+    points, weights = histogram.points()
+
+    def entry(box):
+        """(score, longest axis, box): the box with the most weight times spread is split next."""
+        spread = points[box].max(axis=0) - points[box].min(axis=0)
+        score = weights[box].sum() * spread.max() if len(box) > 1 else 0.0
+        return score, int(np.argmax(spread)), box
+
+    boxes = [entry(np.arange(len(points)))]
+    while len(boxes) < colors:
+        pick = max(range(len(boxes)), key=lambda i: boxes[i][0])
+        if boxes[pick][0] <= 0:
+            break
+        _, axis, box = boxes.pop(pick)
+        # Split along the longest axis at the weighted median
+        box = box[np.argsort(points[box, axis], kind="stable")]
+        cumulative = np.cumsum(weights[box])
+        split = int(np.searchsorted(cumulative, cumulative[-1] / 2)) + 1
+        split = min(max(split, 1), len(box) - 1)
+        boxes.extend([entry(box[:split]), entry(box[split:])])
+    boxes = [box for _, _, box in boxes]
+
+    centres = np.array([np.average(points[box], axis=0, weights=weights[box]) for box in boxes])
+    for _ in range(KMEANS_ROUNDS):
+        nearest = _nearest(points, centres)
+        totals = np.bincount(nearest, weights=weights, minlength=len(centres))
+        used = totals > 0
+        for channel in range(3):
+            sums = np.bincount(nearest, weights=weights * points[:, channel], minlength=len(centres))
+            centres[used, channel] = sums[used] / totals[used]
+    return np.clip(np.rint(centres), 0, 255).astype(np.uint8)
+
+
+def _nearest(points, palette, chunk=65536):
+    """Index of the nearest palette entry for every point (squared RGB distance)."""
+    palette = palette.astype(np.float64)
+    norms = (palette ** 2).sum(axis=1)
+    out = np.empty(len(points), dtype=np.int64)
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk]
+        # |p - c|^2 without the |p|^2 term, which doesn't change the argmin
+        out[start:start + chunk] = (norms[None, :] - 2 * block @ palette.T).argmin(axis=1)
+    return out
+
+
+def nearest_lut(palette):
+    """Lookup table from LUT_BITS-per-channel colour to palette index."""
+    size = 1 << LUT_BITS
+    step = 256 / size
+    axis = np.arange(size) * step + step / 2
+    grid = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+    return _nearest(grid, palette).astype(np.uint8)
+
+
+def _lookup(values, lut):
+    """Palette indices for float or int RGB values (..., 3)."""
+    shift = 8 - LUT_BITS
+    rgb = np.clip(values, 0, 255).astype(np.int32) >> shift
+    return lut[(rgb[..., 0] << (2 * LUT_BITS)) | (rgb[..., 1] << LUT_BITS) | rgb[..., 2]]
+
+
+def _bayer():
+    global _BAYER
+    if _BAYER is None:
+        matrix = np.zeros((1, 1), dtype=np.int32)
+        while matrix.shape[0] < 8:
+            matrix = np.block([[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]])
+        _BAYER = matrix
+    return _BAYER
+
+
+def dither(frames, palette, lut, method, bayer_scale=2):
+    """Map (n, h, w, 3) uint8 frames onto palette; returns RGB frames made only of palette colours."""
+    frames = np.asarray(frames)  # A list of (h, w, 3) frames is stacked
+    if method == "bayer":
+        # Same threshold spread as paletteuse: larger bayer_scale, subtler pattern
+        n, h, w, _ = frames.shape
+        bayer_scale = min(5, max(0, bayer_scale))
+        offsets = (_bayer() >> bayer_scale) - (1 << (5 - bayer_scale))
+        tiled = np.tile(offsets, (h // 8 + 1, w // 8 + 1))[:h, :w]
+        indices = _lookup(frames.astype(np.int32) + tiled[None, :, :, None], lut)
+    elif method in KERNELS:
+        indices = _diffuse(frames, palette, lut, *KERNELS[method])
+    else:
+        indices = _lookup(frames, lut)
+    return palette[indices]
+
+
+def _diffuse(frames, palette, lut, kernel, divisor):
+    """Error diffusion over a wavefront, vectorized across every frame of the batch at once.
+
+    With t = x + slope * y, each pixel only receives error from pixels with
+    a smaller t, so all pixels of one t (in every frame) can be quantized
+    together: w + slope * h steps instead of w * h.
+    """
+    n, h, w, _ = frames.shape
+    slope = max(-dx // dy for dy, dx, _ in kernel if dy > 0) + 1
+    pad = max(abs(dx) for _, dx, _ in kernel)
+    work = np.zeros((n, h + 2, w + 2 * pad, 3), dtype=np.float32)
+    work[:, :h, pad:pad + w] = frames
+    colours = palette.astype(np.float32)
+    indices = np.zeros((n, h, w), dtype=np.uint8)
+    weights = [(dy, dx, weight / divisor) for dy, dx, weight in kernel]
+
+    rows = np.arange(h)
+    for t in range(w + slope * (h - 1)):
+        ys = rows[(t - slope * rows >= 0) & (t - slope * rows < w)]
+        xs = t - slope * ys + pad
+        values = work[:, ys, xs]
+        picked = _lookup(values, lut)
+        indices[:, ys, xs - pad] = picked
+        error = values - colours[picked]
+        for dy, dx, weight in weights:
+            work[:, ys + dy, xs + dx] += error * weight
+    return indices
+
+
+class TemporalHold:
+    """Keeps the previous output colour wherever the source barely changed.
+
+    Dithering noise and sensor grain make static areas differ by a few
+    levels every frame, so the encoder would re-store them. A pixel is only
+    refreshed once its source drifts more than tolerance (any channel) from
+    the value it was last refreshed at, which leaves exact repeats for the
+    GIF encoder to crop and for gifsicle -O3 to make transparent.
+    """
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.reference = None  # Source values each pixel was last refreshed at
+        self.previous = None  # Last output frame
+
+    def apply(self, sources, outputs):
+        """Held copy of (n, h, w, 3) outputs dithered from sources (frames fed in order)."""
+        if self.tolerance <= 0:
+            return outputs
+        outputs = np.array(outputs)
+        for i, source in enumerate(sources):
+            source = np.asarray(source, dtype=np.int16)
+            if self.reference is None or self.reference.shape != source.shape:
+                self.reference = source
+            else:
+                changed = (np.abs(source - self.reference) > self.tolerance).any(axis=-1)
+                outputs[i][~changed] = self.previous[~changed]
+                self.reference = np.where(changed[..., None], source, self.reference)
+            self.previous = outputs[i]
+        return outputs
+
+
+_PPM_HEADER = re.compile(rb"P6\s+(\d+)\s+(\d+)\s+(\d+)\s")
+
+
+class PPMReader:
+    """Splits an ffmpeg image2pipe/ppm byte stream into (h, w, 3) uint8 frames for on_frame."""
+
+    def __init__(self, on_frame):
+        self.on_frame = on_frame
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        self.buffer += data
+        while True:
+            match = _PPM_HEADER.match(self.buffer)
+            if not match:
+                return
+            width, height = int(match.group(1)), int(match.group(2))
+            end = match.end() + width * height * 3
+            if len(self.buffer) < end:
+                return
+            frame = np.frombuffer(bytes(self.buffer[match.end():end]), dtype=np.uint8).reshape(height, width, 3)
+            del self.buffer[:end]
+            self.on_frame(frame)
@@ -0,0 +1,117 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# The report of the optimize run in progress on this thread (copied into worker threads explicitly)
+_current = contextvars.ContextVar("witch_gif_report", default=None)
+
+
+def current_report():
+    return _current.get()
+
+
+@contextmanager
+def activate(report):
+    """Make report the one tool runs record into for the duration of the block."""
+    token = _current.set(report)
+    try:
+        yield report
+    finally:
+        _current.reset(token)
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path) if path else 0
+    except OSError:
+        return 0
+
+
+class RunReport:
+    """Where the time went in one optimize run.
+
+    Every tool run is a span (stage, wall, CPU, peak RSS, bytes in/out,
+    tagged with the attempt it belonged to); every attempt also records the
+    parameters it tried and the size it came out at.
+    """
+
+    def __init__(self, input_path):
+        self.input_path = input_path
+        self.started = time.time()
+        self.finished = None
+        self.attempt = 0  # Attempt the next tool runs belong to, 0 = setup
+        self.spans = []
+        self.attempts = []
+        self._lock = threading.Lock()
+
+    def tool(self, stage, started, usage, reads=(), writes=None, returncode=None, bytes_out=None):
+        """Record one finished tool run. bytes_out overrides the writes file's size (output sent to a pipe)."""
+        span = {
+            "stage": stage,
+            "attempt": self.attempt,
+            "start": started - self.started,
+            "wall": usage.wall,
+            "cpu_user": usage.user,
+            "cpu_system": usage.system,
+            "peak_rss": usage.peak_rss,
+            "bytes_in": sum(_size(path) for path in reads),
+            "bytes_out": bytes_out if bytes_out is not None else _size(writes),
+            "returncode": returncode,
+            "thread": threading.get_ident(),
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    def record_attempt(self, **fields):
+        """Record the parameters and resulting size of one attempt."""
+        with self._lock:
+            self.attempts.append(fields)
+
+    def stages(self):
+        """Totals per stage, in the order stages first ran."""
+        totals = {}
+        for span in self.spans:
+            stage = totals.setdefault(span["stage"], {"runs": 0, "wall": 0.0, "cpu": 0.0, "peak_rss": 0,
+                                                      "bytes_in": 0, "bytes_out": 0})
+            stage["runs"] += 1
+            stage["wall"] += span["wall"]
+            stage["cpu"] += (span["cpu_user"] or 0.0) + (span["cpu_system"] or 0.0)
+            stage["peak_rss"] = max(stage["peak_rss"], span["peak_rss"] or 0)
+            stage["bytes_in"] += span["bytes_in"]
+            stage["bytes_out"] += span["bytes_out"]
+        return totals
+
+    def finish(self):
+        self.finished = time.time()
+
+    def to_dict(self):
+        end = self.finished or time.time()
+        return {
+            "input": self.input_path,
+            "started": self.started,
+            "wall": end - self.started,
+            "stages": self.stages(),
+            "attempts": list(self.attempts),
+            "spans": list(self.spans),
+        }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_chrome_trace(self, path):
+        """Trace Event Format file for chrome://tracing or Perfetto."""
+        threads = {}
+        events = [{"name": "process_name", "ph": "M", "pid": 1,
+                   "args": {"name": os.path.basename(self.input_path)}}]
+        for span in self.spans:
+            tid = threads.setdefault(span["thread"], len(threads) + 1)
+            args = {k: span[k] for k in ("attempt", "cpu_user", "cpu_system", "peak_rss",
+                                         "bytes_in", "bytes_out", "returncode")}
+            events.append({"name": span["stage"], "cat": "tool", "ph": "X", "pid": 1, "tid": tid,
+                           "ts": round(span["start"] * 1e6), "dur": round(span["wall"] * 1e6), "args": args})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,293 @@
+import atexit
+import contextvars
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from .report import current_report
+
+
+# PyInstaller resource resolver
+def resource_path(relative):
+    """ Get the absolute path to the resource, works for dev and for PyInstaller """
+    if hasattr(sys, '_MEIPASS'):  # If running in a packaged PyInstaller app
+        # _MEIPASS is a temporary folder where PyInstaller unpacks resources
+        return os.path.join(sys._MEIPASS, relative)
+    # For development: resources live next to the package, not the cwd
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), relative)
+
+
+def find_tool(name):
+    """Prefer the bundled bin/ copy, fall back to whatever is on PATH."""
+    for candidate in (f"{name}.exe", name):
+        bundled = resource_path(os.path.join("bin", candidate))
+        if os.path.exists(bundled):
+            return bundled
+    return shutil.which(name) or resource_path(os.path.join("bin", f"{name}.exe"))
+
+
+# Get the paths to ffmpeg, ffprobe and gifsicle
+FFMPEG = find_tool("ffmpeg")
+FFPROBE = find_tool("ffprobe")
+GIFSICLE = find_tool("gifsicle")
+
+STARTUPINFO = None
+if os.name == 'nt':  # Only on Windows
+    STARTUPINFO = subprocess.STARTUPINFO()
+    STARTUPINFO.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    # Own process group, so a kill takes the whole tree with it
+    _GROUP = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    _GROUP = {"start_new_session": True}
+
+POLL_INTERVAL = 0.1  # How often a running tool checks for cancellation
+RSS_POLL = 0.01  # How often a running tool's memory high-water mark is sampled on Linux
+
+
+class Cancelled(Exception):
+    """A tool run was stopped because the work was cancelled."""
+
+
+# Every child still running, so app exit can take them all down
+_live = set()
+_live_lock = threading.Lock()
+_shutting_down = False
+
+
+@dataclass
+class ChildUsage:
+    """What one tool run cost."""
+    wall: float = 0.0  # Seconds
+    user: Optional[float] = None  # CPU seconds, None where the OS won't say
+    system: Optional[float] = None
+    peak_rss: Optional[int] = None  # Bytes
+
+    @property
+    def cpu(self):
+        if self.user is None:
+            return None
+        return self.user + (self.system or 0.0)
+
+
+def _reap(proc, usage):
+    """Wait for the child and collect its CPU time and peak memory."""
+    if os.name == 'nt':
+        proc.wait()
+        _windows_usage(proc, usage)
+        return
+    linux = sys.platform.startswith("linux")
+    peak = None
+    try:
+        if linux:
+            # ru_maxrss carries the parent's high-water mark over fork/exec, so sample
+            # the child's own VmHWM while it runs (it is gone once the child exits)
+            while os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is None:
+                peak = _vm_hwm(proc.pid) or peak
+                time.sleep(RSS_POLL)
+        _, status, rusage = os.wait4(proc.pid, 0)
+    except ChildProcessError:
+        proc.wait()  # Already reaped by a poll() elsewhere; the usage is lost
+        return
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    usage.user, usage.system = rusage.ru_utime, rusage.ru_stime
+    if linux:
+        usage.peak_rss = peak  # None when it exited before the first sample
+    else:
+        usage.peak_rss = rusage.ru_maxrss  # Bytes on macOS
+
+
+def _vm_hwm(pid):
+    """Peak resident memory of a running Linux process in bytes, None if unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _windows_usage(proc, usage):
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        handle = wintypes.HANDLE(int(proc._handle))
+        times = [wintypes.FILETIME() for _ in range(4)]
+        if ctypes.windll.kernel32.GetProcessTimes(handle, *[ctypes.byref(t) for t in times]):
+            to_seconds = lambda t: ((t.dwHighDateTime << 32) + t.dwLowDateTime) / 1e7
+            usage.system, usage.user = to_seconds(times[2]), to_seconds(times[3])
+        counters = Counters()
+        counters.cb = ctypes.sizeof(Counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            usage.peak_rss = counters.PeakWorkingSetSize
+    except Exception:
+        pass
+
+
+def kill_tree(proc):
+    """Kill a child and everything it started."""
+    if proc.returncode is not None:
+        return
+    try:
+        if os.name == 'nt':
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                           capture_output=True, startupinfo=STARTUPINFO, timeout=10)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        pass
+
+
+def kill_all():
+    """Kill every running tool and refuse to start new ones (app exit)."""
+    global _shutting_down
+    _shutting_down = True
+    with _live_lock:
+        procs = list(_live)
+    for proc in procs:
+        kill_tree(proc)
+
+
+atexit.register(kill_all)
+
+
+def run(cmd, timeout, cancelled=None, on_stdout=None, stage=None, reads=(), writes=None, chunks=False, stdin=None,
+        **kwargs):
+    """Run a tool quietly (no console window on Windows) and capture its output.
+
+    The child runs in its own process group. On timeout the group is killed
+    and TimeoutExpired raised, as with subprocess.run; when cancelled()
+    turns true it is killed within POLL_INTERVAL and Cancelled is raised.
+
+    With on_stdout, stdout is read line by line on a reader thread and
+    handed over as it arrives instead of being captured (as raw byte chunks
+    with chunks=True, for binary output like rawvideo). stdin, an iterable
+    of bytes, is written to the child on a writer thread; an exception
+    raised by the iterable closes the child's input and is re-raised here.
+
+    The returned CompletedProcess carries a ChildUsage as .usage. When a
+    run report is active the run is also recorded there as stage, with the
+    sizes of the reads files and the writes file (or of the captured
+    stdout when there is no writes file).
+    """
+    if _shutting_down or (cancelled is not None and cancelled()):
+        raise Cancelled()
+
+    by_line = on_stdout is not None and not chunks
+    if by_line:
+        kwargs.setdefault("text", True)
+        kwargs.setdefault("errors", "ignore")
+    text = bool(kwargs.get("text") or kwargs.get("universal_newlines") or kwargs.get("encoding")
+                or kwargs.get("errors"))
+    usage = ChildUsage()
+    started = time.time()
+    clock = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL if stdin is None else subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=STARTUPINFO, **_GROUP,
+                            **kwargs)
+    with _live_lock:
+        _live.add(proc)
+
+    out, err, failed = [], [], []
+    threads = [threading.Thread(target=_pump, args=(proc.stdout, on_stdout or out.append, by_line),
+                                daemon=True),
+               threading.Thread(target=_pump, args=(proc.stderr, err.append, False), daemon=True)]
+    if stdin is not None:
+        # Runs in the caller's context so anything the iterable records lands in the same report
+        threads.append(threading.Thread(target=contextvars.copy_context().run,
+                                        args=(_feed, proc.stdin, stdin, failed), daemon=True))
+    threads.append(threading.Thread(target=_reap, args=(proc, usage), daemon=True))
+    for thread in threads:
+        thread.start()
+    reaper = threads[-1]
+
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            reaper.join(POLL_INTERVAL)
+            if not reaper.is_alive():
+                break
+            if _shutting_down or (cancelled is not None and cancelled()):
+                kill_tree(proc)
+                reaper.join()
+                raise Cancelled()
+            if time.monotonic() >= deadline:
+                kill_tree(proc)
+                reaper.join()
+                raise subprocess.TimeoutExpired(cmd, timeout)
+    except BaseException:
+        kill_tree(proc)  # KeyboardInterrupt and friends: never leave the child behind
+        raise
+    finally:
+        usage.wall = time.perf_counter() - clock
+        for thread in threads[:-1]:
+            thread.join(timeout=5)
+        with _live_lock:
+            _live.discard(proc)
+        # Output captured from stdout counts as bytes out when there is no output file
+        captured = None if writes or on_stdout else sum(len(chunk) for chunk in out)
+        _record(stage or os.path.splitext(os.path.basename(cmd[0]))[0], started, usage, reads, writes,
+                proc.returncode, captured)
+
+    if _shutting_down and proc.returncode:
+        raise Cancelled()  # Killed by kill_all() between polls
+    if failed:
+        raise failed[0]
+    empty = "" if text else b""
+    result = subprocess.CompletedProcess(cmd, proc.returncode, None if on_stdout else empty.join(out),
+                                         empty.join(err))
+    result.usage = usage
+    return result
+
+
+def _pump(stream, sink, lines):
+    """Feed a child's output stream to sink until it closes, by line or in chunks."""
+    try:
+        if lines:
+            for line in stream:
+                sink(line)
+        else:
+            for chunk in iter(lambda: stream.read(65536), stream.read(0)):
+                sink(chunk)
+    except (OSError, ValueError):
+        pass
+    finally:
+        stream.close()
+
+
+def _feed(stream, chunks, failed):
+    """Write chunks to a child's stdin, then close it so the child sees EOF."""
+    try:
+        for chunk in chunks:
+            stream.write(chunk)
+    except (OSError, ValueError):
+        pass  # The child exited or was killed
+    except Exception as e:
+        failed.append(e)
+    finally:
+        try:
+            stream.close()
+        except OSError:
+            pass
+
+
+def _record(stage, started, usage, reads, writes, returncode, bytes_out=None):
+    """Hand a finished run to the active report, if any."""
+    report = current_report()
+    if report is not None:
+        report.tool(stage, started, usage, reads, writes, returncode, bytes_out)